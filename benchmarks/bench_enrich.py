@@ -0,0 +1,78 @@
+"""
+Benchmark del enriquecimiento (enrich_googlebooks.enrich_books) contra el
+mock local de la API de volúmenes (mock_volumes_server) con latencia
+inyectada: libros por segundo, peticiones HTTP y bytes por libro (por la red
+y ya descomprimidos) para distintos tamaños de lote de ISBN.
+
+La caché de respuestas y el límite de QPS se desactivan por defecto para
+medir solo el cliente HTTP y el reparto de resultados. Los resultados se
+guardan en benchmarks/results/<fecha>_enrich.json.
+
+Uso:
+    python benchmarks/bench_enrich.py --books 2000 --latency 0.05 --batch-sizes 1,20,40
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+
+from generate_catalog import goodreads_records
+from mock_volumes_server import start_server
+from stage_timer import StageTimer, save_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del enriquecimiento con Google Books (mock local).")
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.05, help="segundos por respuesta del mock")
+    parser.add_argument('--jitter', type=float, default=0.02, help="segundos extra aleatorios del mock (máximo)")
+    parser.add_argument('--not-found-ratio', type=float, default=0.1)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--batch-sizes', default='1,20', help="ISBN por petición, separados por comas")
+    parser.add_argument('--qps', type=float, default=0, help="límite de peticiones/s (0: sin límite)")
+    parser.add_argument('--cache', action='store_true', help="usar la caché SQLite de respuestas")
+    parser.add_argument('--no-gzip', action='store_true', help="el mock no comprime las respuestas")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency, jitter=args.jitter, not_found_ratio=args.not_found_ratio,
+                          compress=not args.no_gzip)
+    # enrich_googlebooks lee su configuración al importarse
+    os.environ.update({
+        'GOOGLE_BOOKS_API_URL': server.url,
+        'GOOGLE_BOOKS_API_KEY': '',
+        'GOOGLE_BOOKS_QPS': str(args.qps),
+        'ENRICH_CONCURRENCY': str(args.concurrency),
+        'GB_CACHE_ENABLED': '1' if args.cache else '0',
+    })
+    import enrich_googlebooks
+
+    books = list(goodreads_records(args.books))
+    timer = StageTimer()
+    for batch_size in [int(s) for s in args.batch_sizes.split(',') if s.strip()]:
+        # Cada tamaño de lote empieza sin la memoización de los anteriores
+        enrich_googlebooks.QUERY_MEMO.clear()
+        enrich_googlebooks.BOOK_MEMO.clear()
+        requests_before, bytes_before, raw_before = server.requests, server.bytes_sent, server.bytes_raw
+        with timer.stage(f'enrich_books.batch_{batch_size}', rows=len(books), batch_size=batch_size) as info:
+            matched = sum(
+                row['gb_id'] is not None
+                for _, row in enrich_googlebooks.enrich_books(books, args.concurrency, batch_size)
+            )
+            info['http_requests'] = server.requests - requests_before
+            info['bytes_received'] = server.bytes_sent - bytes_before
+            info['bytes_json'] = server.bytes_raw - raw_before
+            info['bytes_per_book'] = round(info['bytes_received'] / len(books))
+            info['matched_books'] = matched
+            info['requests_per_book'] = round(info['http_requests'] / len(books), 3)
+    server.shutdown()
+
+    path = save_results('enrich', vars(args), [{'params': {'books': len(books)}, 'stages': timer.stages}])
+    print(f"[OK] Resultados: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark de la integración (integrate_pipeline), utils_quality y utils_isbn
+sobre catálogos sintéticos de distintos tamaños.
+
+Para cada tamaño genera (o reutiliza) el catálogo en benchmarks/data/<n>,
+mide cada etapa por separado (tiempo, CPU y pico de RSS) y guarda los
+resultados en benchmarks/results/<fecha>_integrate.json.
+
+Uso:
+    python benchmarks/bench_integrate.py --sizes 10k,100k
+    python benchmarks/bench_integrate.py --sizes 1M --duplicate-ratio 0.2 --overlap-ratio 0.5
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+
+import pandas as pd
+
+import integrate_pipeline as ip
+from generate_catalog import write_catalog
+from stage_timer import StageTimer, save_results
+from utils_isbn import canonicalize_isbn_array, validate_isbn10_array, validate_isbn13_array
+from utils_quality import calculate_quality_metrics, validate_types_and_formats
+
+DATA_DIR = BENCH_DIR / 'data'
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1M' -> 1000000."""
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def bench_size(n_books, duplicate_ratio, overlap_ratio, seed, keep_output=False):
+    timer = StageTimer()
+    with timer.stage('generate_catalog', rows=n_books):
+        gr_path, gb_path = write_catalog(DATA_DIR / str(n_books), n_books, duplicate_ratio, overlap_ratio, seed)
+
+    with timer.stage('load_landing', rows=n_books * 2):
+        gr_df, gb_df = ip.load_landing(gr_path, gb_path)
+
+    # utils_isbn (vectorizado)
+    isbns = pd.concat([gr_df['isbn13'], gb_df['isbn13'], gr_df['isbn10']], ignore_index=True)
+    with timer.stage('isbn.validate_isbn13_array', rows=len(isbns)):
+        validate_isbn13_array(isbns)
+    with timer.stage('isbn.validate_isbn10_array', rows=len(isbns)):
+        validate_isbn10_array(isbns)
+    with timer.stage('isbn.canonicalize_isbn_array', rows=len(isbns)):
+        canonicalize_isbn_array(isbns)
+
+    # utils_quality
+    typed_gr, typed_gb = ip.ensure_types(gr_df), ip.ensure_types(gb_df)
+    with timer.stage('quality.calculate_quality_metrics', rows=len(gr_df) + len(gb_df)):
+        calculate_quality_metrics(typed_gr, typed_gb)
+    with timer.stage('quality.validate_types_and_formats', rows=len(gb_df)):
+        validate_types_and_formats(gb_df, 'googlebooks')
+    del typed_gr, typed_gb
+
+    # integrate_pipeline, etapa a etapa (como run() en modo full)
+    ingestion_ts = '2025-01-01T00:00:00'
+    with timer.stage('integrate.prepare_sources', rows=len(gr_df) + len(gb_df)):
+        df_gr, df_gb, quality_metrics = ip.prepare_sources(gr_df, gb_df, ingestion_ts)
+    detail = pd.concat([df_gr, df_gb], ignore_index=True, sort=False)
+    with timer.stage('integrate.merge_sources', rows=len(detail)):
+        merged = ip.merge_sources(df_gr, df_gb, ingestion_ts)
+    with timer.stage('integrate.deduplicate_books', rows=len(merged)):
+        dim_book = ip.deduplicate_books(merged)
+    with timer.stage('integrate.assign_book_ids', rows=len(dim_book)):
+        dim_book['book_id_chosen'] = ip.assign_book_ids(dim_book)
+    with timer.stage('integrate.link_source_detail', rows=len(detail)):
+        detail = ip.link_source_detail(detail, dim_book)
+    quality_metrics['duplicados_encontrados'] = len(detail) - len(dim_book)
+
+    out_dir = Path(tempfile.mkdtemp(prefix='bench_integrate_'))
+    try:
+        result = ip.IntegrationResult(dim_book, detail, quality_metrics, ingestion_ts)
+        with timer.stage('integrate.write_outputs', rows=len(dim_book) + len(detail)):
+            paths = ip.write_outputs(result, out_dir)
+        sizes = {name: _size_mb(Path(path)) for name, path in paths.items()}
+        del result, detail, dim_book, merged, df_gr, df_gb
+
+        with timer.stage('integrate.run_full', rows=len(gr_df) + len(gb_df)):
+            ip.run(gr_df, gb_df, out_dir=out_dir, ingestion_ts=ingestion_ts)
+        with timer.stage('integrate.run_incremental_unchanged', rows=len(gr_df) + len(gb_df)):
+            ip.run(gr_df, gb_df, out_dir=out_dir, mode='incremental', ingestion_ts=ingestion_ts)
+    finally:
+        if keep_output:
+            print(f"[INFO] Salida conservada en {out_dir}")
+        else:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    return {
+        'params': {'books': n_books, 'goodreads_rows': len(gr_df), 'googlebooks_rows': len(gb_df)},
+        'output_mb': sizes,
+        'stages': timer.stages,
+    }
+
+
+def _size_mb(path):
+    files = path.rglob('*') if path.is_dir() else [path]
+    return round(sum(p.stat().st_size for p in files if p.is_file()) / 1024 / 1024, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de integración, calidad e ISBN.")
+    parser.add_argument('--sizes', default='10k,100k', help="tamaños separados por comas (10k,100k,1M,10M)")
+    parser.add_argument('--duplicate-ratio', type=float, default=0.05)
+    parser.add_argument('--overlap-ratio', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep-output', action='store_true', help="no borrar las tablas escritas")
+    args = parser.parse_args()
+
+    runs = []
+    for n_books in [parse_size(s) for s in args.sizes.split(',') if s.strip()]:
+        print(f"[INFO] Catálogo de {n_books} libros")
+        runs.append(bench_size(n_books, args.duplicate_ratio, args.overlap_ratio, args.seed, args.keep_output))
+
+    path = save_results('integrate', {
+        'sizes': args.sizes, 'duplicate_ratio': args.duplicate_ratio,
+        'overlap_ratio': args.overlap_ratio, 'seed': args.seed,
+    }, runs)
+    print(f"[OK] Resultados: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+Comprobaciones de la integración sobre catálogos pequeños: el modo
+incremental debe dar las mismas tablas que una integración completa sobre
+el mismo landing (salvo los timestamps de ingesta).
+
+- `gr_after_gb`: un libro que solo estaba en Google Books recibe después un
+  registro de Goodreads con el mismo ISBN (Goodreads pasa a ser la fuente
+  ganadora).
+- `isbn_change`: un libro cambia de ISBN entre entregas (también el de una
+  fila de Google Books) y otro sale del landing; sus filas anteriores se
+  retiran.
+- `synthetic`: el catálogo sintético llega en varias entregas crecientes.
+- `synthetic_<columna>`: lo mismo con dim_book particionado por `year_pub` y
+  por `language_bcp` (reescritura solo de las particiones afectadas); el
+  dataset además tiene que poder leerse con pd.read_parquet sin opciones.
+- `run_pipeline_x2`: dos ejecuciones de run_pipeline sobre el mismo
+  directorio (scraper simulado con el catálogo sintético y Google Books
+  contra mock_volumes_server) dejan en standard/ y en las métricas de calidad
+  lo mismo que una integración completa de su landing.
+- `run_pipeline_isbn_change`: lo mismo, pero en la segunda ejecución algunos
+  libros pierden el ISBN o pasan a tener el de otro. Las métricas de calidad
+  del pipeline son las de su ejecución, así que solo se compara
+  `duplicados_encontrados`.
+
+Uso:
+    python benchmarks/check_integrate.py
+    python benchmarks/check_integrate.py --books 20000 --steps 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+
+import pandas as pd
+
+import integrate_pipeline as ip
+from generate_catalog import GOOGLEBOOKS_FIELDS, goodreads_records, googlebooks_rows
+from mock_volumes_server import start_server
+
+# Columnas que dependen del momento de la ejecución
+TS_COLUMNS = ['ts_last_update', '_ingestion_ts']
+
+
+def write_landing(landing, gr_records, gb_rows):
+    landing.mkdir(parents=True, exist_ok=True)
+    gr_path, gb_path = landing / 'goodreads_books.json', landing / 'googlebooks_books.csv'
+    gr_path.write_text(json.dumps({'metadata': {}, 'data': gr_records}), encoding='utf-8')
+    with open(gb_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=GOOGLEBOOKS_FIELDS)
+        writer.writeheader()
+        writer.writerows(gb_rows)
+    return gr_path, gb_path
+
+
+def integrate(base, gr_records, gb_rows, mode, step, partition_by=None):
+    """Escribe el landing de la entrega en `base` e integra en `base`/standard."""
+    gr_path, gb_path = write_landing(base / 'landing', gr_records, gb_rows)
+    gr_df, gb_df = ip.load_landing(gr_path, gb_path)
+    ip.run(gr_df, gb_df, out_dir=base, mode=mode, ingestion_ts=f'2025-01-{step + 1:02d}T00:00:00',
+           partition_by=partition_by)
+
+
+def read_tables(base):
+    """dim_book y detalle escritos en `base`, sin timestamps y en orden estable."""
+    dim_path = base / 'standard' / ip.DIM_BOOK_FILE
+    dim = ip.read_table(dim_path, ip.DIM_BOOK_SCHEMA).to_pandas()
+    # Un dim_book particionado también se tiene que poder leer sin opciones
+    if len(pd.read_parquet(dim_path)) != len(dim):
+        raise AssertionError(f"pd.read_parquet({dim_path}) no devuelve todas las filas")
+    detail = pd.read_parquet(base / 'standard' / ip.SOURCE_DETAIL_FILE)
+    dim = dim.drop(columns=TS_COLUMNS, errors='ignore')
+    dim = dim.sort_values('book_id_chosen', kind='mergesort').reset_index(drop=True)
+    detail = detail.drop(columns=TS_COLUMNS, errors='ignore')
+    detail = detail.sort_values(['_source_name', '_key', '_row_hash'], kind='mergesort').reset_index(drop=True)
+    return dim, detail
+
+
+def compare_tables(got_base, expected_base):
+    """Diferencias entre las tablas escritas en `got_base` y en `expected_base`."""
+    errors = []
+    for table, got, expected in zip(['dim_book', 'detail'], read_tables(got_base), read_tables(expected_base)):
+        try:
+            pd.testing.assert_frame_equal(got, expected, check_like=True, check_categorical=False)
+        except AssertionError as e:
+            errors.append(f"{table}: {e}")
+    return errors
+
+
+def report(name, errors, what):
+    if errors:
+        print(f"[ERROR] {name}: {what}")
+        for error in errors:
+            print(f"   {error}")
+        return False
+    print(f"[OK] {name}: {what.replace('!=', '==')}")
+    return True
+
+
+def check_steps(name, steps, partition_by=None):
+    """
+    Integra cada entrega (gr_records, gb_rows) en modo incremental (con
+    `partition_by`) y compara el resultado final con una integración
+    completa, sin partición, de la última entrega.
+    """
+    with tempfile.TemporaryDirectory(prefix=f'check_{name}_') as tmp:
+        incremental, full = Path(tmp) / 'incremental', Path(tmp) / 'full'
+        try:
+            for step, (gr_records, gb_rows) in enumerate(steps):
+                integrate(incremental, gr_records, gb_rows, 'incremental', step, partition_by)
+            integrate(full, *steps[-1], 'full', len(steps))
+            errors = compare_tables(incremental, full)
+        except Exception as e:
+            errors = [f"{type(e).__name__}: {e}"]
+    return report(name, errors, 'incremental != completa')
+
+
+def reissue_isbns(records, run):
+    """Copia de `records` en la que, de cada 20 libros, uno pierde el ISBN-13 y otro toma el del siguiente."""
+    records = {url: dict(record) for url, record in records.items()}
+    books = list(records.values())
+    for i, record in enumerate(books):
+        if i % 20 == run:
+            record['isbn13'] = None
+        elif i % 20 == run + 10 and i + 1 < len(books):
+            record['isbn13'] = books[i + 1]['isbn13']
+    return records
+
+
+def check_pipeline_runs(name, n_books, n_runs=2, reissue=False):
+    """
+    Ejecuta run_pipeline `n_runs` veces sobre el mismo directorio y compara
+    standard/ y las métricas de calidad con una integración completa del
+    landing resultante. El scraper devuelve los libros del catálogo
+    sintético (con `reissue`, con ISBN cambiados a partir de la segunda
+    ejecución) y Google Books es mock_volumes_server; con un solo hilo por
+    etapa el orden de llegada es el mismo en cada ejecución.
+    """
+    server = start_server(latency=0)
+    catalog = {record['book_url']: record for record in goodreads_records(n_books)}
+    records = {}
+    with tempfile.TemporaryDirectory(prefix=f'check_{name}_') as tmp:
+        base, full = Path(tmp) / 'pipeline', Path(tmp) / 'full'
+        (base / 'landing').mkdir(parents=True)
+        env = {
+            'SEARCH_QUERIES': 'synthetic', 'MAX_BOOKS': str(n_books), 'SCRAPE_MAX_AGE_HOURS': '0',
+            'RATE_LIMIT_SECONDS': '0', 'SCRAPE_WORKERS': '1', 'SEARCH_WORKERS': '1', 'ENRICH_CONCURRENCY': '1',
+            'SCRAPE_STATE_PATH': str(base / 'staging' / 'goodreads_state.sqlite'),
+            'ENRICH_CHECKPOINT_PATH': str(base / 'staging' / 'googlebooks_checkpoint.jsonl'),
+            'GOOGLE_BOOKS_API_URL': server.url, 'GOOGLE_BOOKS_API_KEY': '', 'GOOGLE_BOOKS_QPS': '0',
+            'GB_CACHE_ENABLED': '0', 'PIPELINE_BATCH_SIZE': str(max(1, n_books // 4)), 'PIPELINE_BATCH_SECONDS': '1',
+        }
+        gr_path, gb_path = base / 'landing' / 'goodreads_books.ndjson', base / 'landing' / 'googlebooks_books.csv'
+
+        def search_results(browser, query, max_books):
+            for record in list(records.values())[:max_books]:
+                yield {k: record[k] for k in ('title', 'author', 'rating', 'ratings_count', 'book_url')}
+
+        def book_detail(browser, book):
+            record = records[book['book_url']]
+            book.update({k: record[k] for k in ('isbn10', 'isbn13', 'scrape_source', 'scrape_date')})
+
+        try:
+            with mock.patch.dict(os.environ, env):
+                # Las etapas leen su configuración al importarse
+                import run_pipeline
+                import scrape_goodreads
+                with mock.patch.object(scrape_goodreads, 'RecyclingDriver', mock.MagicMock), \
+                     mock.patch.object(scrape_goodreads, 'iter_search_results', search_results), \
+                     mock.patch.object(scrape_goodreads, 'scrape_book_detail', book_detail), \
+                     mock.patch.multiple(ip, BASE_DIR=base, STANDARD_DIR=base / 'standard',
+                                         DOCS_DIR=base / 'docs', WORK_DIR=base / 'staging'), \
+                     mock.patch.multiple(run_pipeline, GOODREADS_OUT=gr_path, GOOGLEBOOKS_OUT=gb_path):
+                    for run in range(n_runs):
+                        records.clear()
+                        records.update(reissue_isbns(catalog, run) if run and reissue else catalog)
+                        run_pipeline.main()
+
+            gr_df, gb_df = ip.load_landing(gr_path, gb_path)
+            ip.run(gr_df, gb_df, out_dir=full, mode='full', ingestion_ts='2025-01-01T00:00:00')
+            errors = compare_tables(base, full)
+            metrics = [json.loads((b / 'docs' / 'quality_metrics.json').read_text()) for b in (base, full)]
+            if reissue:
+                metrics = [{'duplicados_encontrados': m['duplicados_encontrados']} for m in metrics]
+            if metrics[0] != metrics[1]:
+                errors.append(f"quality_metrics: {metrics[0]} != {metrics[1]}")
+        except Exception as e:
+            errors = [f"{type(e).__name__}: {e}"]
+        finally:
+            server.shutdown()
+    return report(name, errors, 'pipeline != completa del landing')
+
+
+def gr_after_gb_steps():
+    gr_other = {'title': 'Otro', 'author': 'Ana Gil', 'rating': 4.0, 'ratings_count': 10,
+                'book_url': 'https://www.goodreads.com/book/show/1', 'isbn10': None,
+                'isbn13': '9780140449136', 'scrape_source': 'goodreads', 'scrape_date': '2025-01-01T00:00:00Z'}
+    gr_book = {**gr_other, 'title': 'A gr', 'book_url': 'https://www.goodreads.com/book/show/2',
+               'isbn13': '9780306406157'}
+    gb_book = {**dict.fromkeys(GOOGLEBOOKS_FIELDS, ''), 'gb_id': 'gb1', 'title': 'A', 'authors': 'Tom Roe',
+               'isbn13': '9780306406157', 'isbn10': '0306406152', 'query_used': 'isbn:9780306406157'}
+    return [([gr_other], [gb_book]), ([gr_other, gr_book], [gb_book])]
+
+
+def isbn_change_steps():
+    gr_book = {'title': 'A', 'author': 'Tom Roe', 'rating': 4.0, 'ratings_count': 10,
+               'book_url': 'https://www.goodreads.com/book/show/1', 'isbn10': None,
+               'isbn13': '9780306406157', 'scrape_source': 'goodreads', 'scrape_date': '2025-01-01T00:00:00Z'}
+    gr_other = {**gr_book, 'title': 'B', 'book_url': 'https://www.goodreads.com/book/show/2',
+                'isbn13': '9780140449136'}
+    gb_book = {**dict.fromkeys(GOOGLEBOOKS_FIELDS, ''), 'gb_id': 'gb1', 'title': 'A', 'authors': 'Tom Roe',
+               'isbn13': '9780306406157', 'query_used': 'isbn:9780306406157'}
+    gb_other = {**gb_book, 'gb_id': 'gb2', 'title': 'C', 'isbn13': '9781861972712',
+                'query_used': 'isbn:9781861972712'}
+    return [
+        ([gr_book, gr_other], [gb_book, gb_other]),
+        ([{**gr_book, 'isbn13': '9781861972712'}], [gb_book, {**gb_other, 'isbn13': '9780306406157'}]),
+    ]
+
+
+def synthetic_steps(n_books, n_steps):
+    gr_records = list(goodreads_records(n_books))
+    gb_rows = list(googlebooks_rows(n_books))
+    return [
+        (gr_records[:len(gr_records) * k // n_steps], gb_rows[:len(gb_rows) * k // n_steps])
+        for k in range(1, n_steps + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprueba que la integración incremental equivale a la completa.")
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--steps', type=int, default=3)
+    args = parser.parse_args()
+
+    synthetic = synthetic_steps(args.books, args.steps)
+    ok = all([
+        check_steps('gr_after_gb', gr_after_gb_steps()),
+        check_steps('isbn_change', isbn_change_steps()),
+        check_steps('synthetic', synthetic),
+        check_steps('synthetic_year_pub', synthetic, partition_by='year_pub'),
+        check_steps('synthetic_language_bcp', synthetic, partition_by='language_bcp'),
+        check_pipeline_runs('run_pipeline_x2', min(args.books, 1000)),
+        check_pipeline_runs('run_pipeline_isbn_change', min(args.books, 1000), reissue=True),
+    ])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Catálogo sintético para benchmarks -> <out>/landing/goodreads_books.json y
+<out>/landing/googlebooks_books.csv (mismo formato que el scraper y el
+enriquecimiento).
+
+- `duplicate_ratio`: fracción de registros de Goodreads que repiten el ISBN
+  de un libro anterior (otra edición/URL del mismo libro), para la
+  deduplicación.
+- `overlap_ratio`: fracción de filas de Google Books con el ISBN de un
+  libro de Goodreads; el resto son libros que solo están en Google Books.
+- Una parte de los registros trae huecos y valores inválidos (títulos
+  nulos, fechas mal formadas, idiomas y monedas sin normalizar) para que
+  las métricas de calidad y la validación trabajen como con datos reales.
+
+Los ficheros se escriben en streaming por bloques, así que también sirve
+para 10M de libros sin cargarlos en memoria. El resultado solo depende de
+los parámetros (y la semilla).
+
+Uso:
+    python benchmarks/generate_catalog.py --books 100000 --out benchmarks/data/100k
+"""
+
+import argparse
+import csv
+import json
+from pathlib import Path
+
+import numpy as np
+
+CHUNK = 100_000
+AUTHORS = ['Tom Roe', 'Lee Ku', 'Pia Ox', 'Bo Li', 'Ana Gil', 'Max Orr', 'Eva Sol', 'Ian Paz']
+PUBLISHERS = ['Penguin', 'HarperCollins', 'Anagrama', 'Planeta', '']
+PUB_DATES = ['2004', '2004-05', '2010-02-03', '1999-12-31', 'May 2004', 'bad-date', '']
+LANGUAGES = ['en', 'es', 'fr', 'en-GB', 'EN ', '']
+CATEGORIES = ['Fiction', 'Fiction;Art', 'History', 'Science;Nature', '']
+CURRENCIES = ['EUR', 'USD', 'usd', '']
+QUERIES = ['animals', 'history', 'science', 'art']
+
+GOOGLEBOOKS_FIELDS = [
+    'gb_id', 'title', 'subtitle', 'authors', 'publisher', 'pub_date',
+    'language', 'categories', 'isbn13', 'isbn10', 'price_amount', 'price_currency', 'query_used'
+]
+
+
+# =============================================================================
+# ISBN
+# =============================================================================
+def _digits(ids, width):
+    # Matriz (width x N) con los dígitos decimales de cada id (el primero arriba)
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return (ids[None, :] // powers[:, None]) % 10
+
+def isbn_pairs(ids):
+    """ISBN-13 (prefijo 978) e ISBN-10 válidos del mismo libro para cada id (< 10^9)."""
+    body = _digits(np.asarray(ids, dtype=np.int64) % 10**9, 9)
+    check10 = (11 - (body * np.arange(10, 1, -1)[:, None]).sum(axis=0) % 11) % 11
+    full = np.vstack([np.array([[9], [7], [8]]).repeat(body.shape[1], axis=1), body])
+    check13 = (10 - (full * np.array([1, 3] * 6)[:, None]).sum(axis=0) % 10) % 10
+    bodies = [''.join(map(str, col)) for col in body.T]
+    isbn13 = [f"978{b}{c}" for b, c in zip(bodies, check13)]
+    isbn10 = [f"{b}{'X' if c == 10 else c}" for b, c in zip(bodies, check10)]
+    return isbn13, isbn10
+
+
+# =============================================================================
+# REGISTROS
+# =============================================================================
+def goodreads_records(n_books, duplicate_ratio=0.05, seed=0):
+    """Registros de Goodreads (dicts como los del scraper), por bloques."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_books, CHUNK):
+        ids = np.arange(start, min(start + CHUNK, n_books))
+        # Los duplicados reutilizan el ISBN de un libro anterior
+        book_ids = ids.copy()
+        dup = (rng.random(len(ids)) < duplicate_ratio) & (ids > 0)
+        book_ids[dup] = (rng.random(dup.sum()) * ids[dup]).astype(np.int64)
+        isbn13, isbn10 = isbn_pairs(book_ids)
+        title_null = rng.random(len(ids)) < 0.02
+        has_isbn13 = rng.random(len(ids)) < 0.92
+        has_isbn10 = rng.random(len(ids)) < 0.7
+        authors = rng.integers(0, len(AUTHORS), len(ids))
+        ratings = np.round(rng.uniform(1, 5, len(ids)), 2)
+        counts = rng.integers(0, 100_000, len(ids))
+        queries = rng.integers(0, len(QUERIES), len(ids))
+        for k, i in enumerate(ids):
+            yield {
+                'title': None if title_null[k] else f"Book {book_ids[k]}",
+                'author': AUTHORS[authors[k]],
+                'rating': float(ratings[k]),
+                'ratings_count': int(counts[k]),
+                'book_url': f"https://www.goodreads.com/book/show/{i}",
+                'isbn10': isbn10[k] if has_isbn10[k] else None,
+                'isbn13': isbn13[k] if has_isbn13[k] else None,
+                'scrape_source': 'goodreads',
+                'scrape_date': '2025-01-01T00:00:00Z',
+                'queries': [QUERIES[queries[k]]],
+            }
+
+def googlebooks_rows(n_books, overlap_ratio=0.8, seed=0):
+    """Filas del CSV de Google Books (dicts con GOOGLEBOOKS_FIELDS), por bloques."""
+    rng = np.random.default_rng(seed + 1)
+    for start in range(0, n_books, CHUNK):
+        ids = np.arange(start, min(start + CHUNK, n_books))
+        # Solapamiento: mismo ISBN que un libro de Goodreads; el resto, fuera de su rango
+        overlap = rng.random(len(ids)) < overlap_ratio
+        book_ids = np.where(overlap, (rng.random(len(ids)) * n_books).astype(np.int64), n_books + ids)
+        isbn13, isbn10 = isbn_pairs(book_ids)
+        not_found = rng.random(len(ids)) < 0.05
+        has_isbn10 = rng.random(len(ids)) < 0.5
+        title_null = rng.random(len(ids)) < 0.02
+        picks = {name: rng.integers(0, len(values), len(ids)) for name, values in
+                 [('publisher', PUBLISHERS), ('pub_date', PUB_DATES), ('language', LANGUAGES),
+                  ('categories', CATEGORIES), ('currency', CURRENCIES)]}
+        n_authors = rng.integers(0, 3, len(ids))
+        first_author = rng.integers(0, len(AUTHORS), len(ids))
+        prices = np.round(rng.uniform(1, 60, len(ids)), 2)
+        for k, i in enumerate(ids):
+            if not_found[k]:
+                # Libro sin resultado en la API (como enrich_book)
+                yield {**dict.fromkeys(GOOGLEBOOKS_FIELDS, ''), 'isbn13': 'NO_ISBN_GOOGLE_API',
+                       'query_used': f"isbn:{isbn13[k]}"}
+                continue
+            currency = CURRENCIES[picks['currency'][k]]
+            yield {
+                'gb_id': f"gb{book_ids[k]}",
+                'title': '' if title_null[k] else f"Book {book_ids[k]}",
+                'subtitle': '',
+                'authors': ';'.join(AUTHORS[(first_author[k] + j) % len(AUTHORS)] for j in range(n_authors[k])),
+                'publisher': PUBLISHERS[picks['publisher'][k]],
+                'pub_date': PUB_DATES[picks['pub_date'][k]],
+                'language': LANGUAGES[picks['language'][k]],
+                'categories': CATEGORIES[picks['categories'][k]],
+                'isbn13': isbn13[k],
+                'isbn10': isbn10[k] if has_isbn10[k] else '',
+                'price_amount': prices[k] if currency else '',
+                'price_currency': currency,
+                'query_used': f"isbn:{isbn13[k]}",
+            }
+
+
+# =============================================================================
+# ESCRITURA
+# =============================================================================
+def write_catalog(out_dir, n_books, duplicate_ratio=0.05, overlap_ratio=0.8, seed=0):
+    """
+    Escribe el catálogo en `out_dir`/landing y devuelve las rutas
+    (goodreads, googlebooks). Si ya existe con los mismos parámetros, no
+    se vuelve a generar.
+    """
+    landing = Path(out_dir) / 'landing'
+    gr_path = landing / 'goodreads_books.json'
+    gb_path = landing / 'googlebooks_books.csv'
+    params = {'books': n_books, 'duplicate_ratio': duplicate_ratio, 'overlap_ratio': overlap_ratio, 'seed': seed}
+    params_path = landing / 'catalog.json'
+    if gr_path.exists() and gb_path.exists() and params_path.exists():
+        if json.loads(params_path.read_text(encoding='utf-8')) == params:
+            return gr_path, gb_path
+    landing.mkdir(parents=True, exist_ok=True)
+
+    with open(gr_path, 'w', encoding='utf-8') as f:
+        f.write('{"metadata": ' + json.dumps({'synthetic': params}) + ', "data": [\n')
+        for i, record in enumerate(goodreads_records(n_books, duplicate_ratio, seed)):
+            f.write((',\n' if i else '') + json.dumps(record, ensure_ascii=False))
+        f.write('\n]}\n')
+
+    with open(gb_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=GOOGLEBOOKS_FIELDS)
+        writer.writeheader()
+        writer.writerows(googlebooks_rows(n_books, overlap_ratio, seed))
+
+    params_path.write_text(json.dumps(params), encoding='utf-8')
+    return gr_path, gb_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un catálogo sintético de landing.")
+    parser.add_argument('--books', type=int, default=10_000)
+    parser.add_argument('--out', default=None, help="directorio de salida (default benchmarks/data/<books>)")
+    parser.add_argument('--duplicate-ratio', type=float, default=0.05)
+    parser.add_argument('--overlap-ratio', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    out = args.out or Path(__file__).resolve().parent / 'data' / str(args.books)
+    gr_path, gb_path = write_catalog(out, args.books, args.duplicate_ratio, args.overlap_ratio, args.seed)
+    print(f"[OK] Catálogo sintético: {gr_path}, {gb_path}")
+
+
+if __name__ == '__main__':
+    main()
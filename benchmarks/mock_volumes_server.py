@@ -0,0 +1,165 @@
+"""
+Servidor HTTP local que imita el endpoint de volúmenes de Google Books
+(GET /books/v1/volumes?q=...) para medir el enriquecimiento sin depender de
+la API real ni de su cuota.
+
+- `isbn:A OR isbn:B ...`: un volumen por ISBN encontrado.
+- `intitle:"..."` / `inauthor:"..."`: un volumen con ese título y autor.
+- Una fracción fija de ISBN y títulos (`not_found_ratio`, decidida por hash,
+  así que es estable entre ejecuciones) no devuelve resultados.
+- Cada respuesta tarda `latency` segundos más un extra aleatorio de hasta
+  `jitter` segundos, para simular la latencia de red.
+- Si el cliente acepta gzip, la respuesta va comprimida (como la API real);
+  `bytes_sent` cuenta los bytes enviados y `bytes_raw` los del JSON.
+
+Uso:
+    python benchmarks/mock_volumes_server.py --port 8765 --latency 0.1
+    GOOGLE_BOOKS_API_URL=http://127.0.0.1:8765/books/v1/volumes python src/enrich_googlebooks.py
+"""
+
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+VOLUMES_PATH = '/books/v1/volumes'
+MAX_RESULTS_LIMIT = 40
+
+
+def _found(text, not_found_ratio):
+    return zlib.crc32(text.encode('utf-8')) % 10_000 >= not_found_ratio * 10_000
+
+
+def _volume(volume_id, title, authors, isbn13=None):
+    info = {
+        'title': title,
+        'authors': authors,
+        'publisher': 'Mock Press',
+        'publishedDate': '2004-05-12',
+        'language': 'en',
+        'categories': ['Fiction'],
+    }
+    if isbn13:
+        info['industryIdentifiers'] = [
+            {'type': 'ISBN_13', 'identifier': isbn13},
+            {'type': 'ISBN_10', 'identifier': isbn13[3:12] + 'X'},
+        ]
+    return {
+        'id': volume_id,
+        'volumeInfo': info,
+        'saleInfo': {'listPrice': {'amount': 9.99, 'currencyCode': 'EUR'}},
+    }
+
+
+def volumes_response(query, not_found_ratio=0.1, max_results=10):
+    """Respuesta JSON (dict) de la API para la búsqueda `query`."""
+    isbns = re.findall(r'isbn:([0-9Xx-]+)', query)
+    if isbns:
+        items = [_volume(f"mock-{isbn}", f"Book {isbn}", ['Mock Author'], isbn)
+                 for isbn in isbns if _found(isbn, not_found_ratio)]
+    else:
+        title = re.search(r'intitle:"([^"]*)"', query)
+        author = re.search(r'inauthor:"([^"]*)"', query)
+        title = title.group(1) if title else query
+        items = []
+        if _found(title, not_found_ratio):
+            items = [_volume(f"mock-t{zlib.crc32(title.encode('utf-8'))}", title,
+                             [author.group(1)] if author else ['Mock Author'])]
+    items = items[:max_results]
+    return {'kind': 'books#volumes', 'totalItems': len(items), 'items': items} if items else \
+        {'kind': 'books#volumes', 'totalItems': 0}
+
+
+class MockVolumesServer(ThreadingHTTPServer):
+    """Servidor con contadores de peticiones y bytes enviados."""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.05, jitter=0.0, not_found_ratio=0.1, compress=True):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.not_found_ratio = not_found_ratio
+        self.compress = compress
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_raw = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{VOLUMES_PATH}"
+
+    def count(self, n_bytes, n_raw):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += n_bytes
+            self.bytes_raw += n_raw
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != VOLUMES_PATH:
+            self.send_error(404)
+            return
+        params = parse_qs(url.query)
+        query = params.get('q', [''])[0]
+        max_results = min(MAX_RESULTS_LIMIT, int(params.get('maxResults', ['10'])[0]))
+        server = self.server
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        raw = json.dumps(volumes_response(query, server.not_found_ratio, max_results)).encode('utf-8')
+        body = raw
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        if server.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(raw)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        server.count(len(body), len(raw))
+
+
+def start_server(port=0, latency=0.05, jitter=0.0, not_found_ratio=0.1, compress=True):
+    """Arranca el servidor en un hilo (port=0: puerto libre) y lo devuelve."""
+    server = MockVolumesServer(('127.0.0.1', port), latency, jitter, not_found_ratio, compress)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API de volúmenes de Google Books.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help="segundos por respuesta")
+    parser.add_argument('--jitter', type=float, default=0.0, help="segundos extra aleatorios (máximo)")
+    parser.add_argument('--not-found-ratio', type=float, default=0.1)
+    parser.add_argument('--no-gzip', action='store_true', help="no comprimir las respuestas")
+    args = parser.parse_args()
+
+    server = MockVolumesServer(('127.0.0.1', args.port), args.latency, args.jitter, args.not_found_ratio,
+                               compress=not args.no_gzip)
+    print(f"[INFO] Mock de Google Books en {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
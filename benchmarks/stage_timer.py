@@ -0,0 +1,152 @@
+"""
+Medición de etapas para los benchmarks: tiempo de reloj, tiempo de CPU y
+pico de memoria (RSS) de cada etapa, y guardado de los resultados en JSON
+(benchmarks/results/) para compararlos entre versiones.
+
+El pico de RSS se muestrea en un hilo cada pocos milisegundos a partir de
+/proc/self/statm, así que incluye la memoria de Arrow y NumPy (que
+tracemalloc no ve del todo). Fuera de Linux se usa ru_maxrss (pico del
+proceso entero) y, si no está disponible, no se informa.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+SAMPLE_SECONDS = 0.005
+_STATM = Path('/proc/self/statm')
+
+
+def current_rss():
+    """RSS actual del proceso en bytes (None si no se puede medir)."""
+    if _STATM.exists():
+        return int(_STATM.read_text().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss: KB en Linux, bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _PeakSampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(SAMPLE_SECONDS):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        return self.peak
+
+
+def _mb(value):
+    return None if value is None else round(value / 1024 / 1024, 1)
+
+
+class StageTimer:
+    """
+    Acumula las mediciones de las etapas: `with timer.stage('nombre', rows=n) as info: ...`.
+    Lo que se añada a `info` dentro del bloque se guarda con la etapa.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, **info):
+        rss_start = current_rss()
+        sampler = _PeakSampler()
+        sampler.start()
+        info = dict(info)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield info
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak = sampler.stop()
+            if peak is not None and rss_start is not None:
+                peak = max(peak, rss_start)
+            entry = {
+                'stage': name,
+                'wall_s': round(wall, 4),
+                'cpu_s': round(cpu, 4),
+                'rss_start_mb': _mb(rss_start),
+                'rss_peak_mb': _mb(peak),
+                'rss_peak_delta_mb': _mb(None if peak is None or rss_start is None else peak - rss_start),
+                **info,
+            }
+            rows = info.get('rows')
+            if rows and wall > 0:
+                entry['rows_per_s'] = round(rows / wall)
+            self.stages.append(entry)
+            delta = entry['rss_peak_delta_mb']
+            print(f"[INFO] {name}: {wall:.2f}s" + (f", pico RSS +{delta:.0f} MB" if delta is not None else ""))
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).resolve().parent,
+            capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment():
+    """Versión del código y del entorno, para comparar resultados entre ejecuciones."""
+    versions = {}
+    for module in ('pandas', 'numpy', 'pyarrow', 'requests'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+    return {
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        **versions,
+    }
+
+
+def save_results(name, params, runs, results_dir=RESULTS_DIR):
+    """
+    Guarda los resultados en `results_dir`/<fecha UTC>_<name>.json y devuelve
+    la ruta. `runs` es una lista de {'params': ..., 'stages': [...]}.
+    """
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    path = results_dir / f"{now.strftime('%Y%m%dT%H%M%SZ')}_{name}.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'benchmark': name,
+            'created_at': now.isoformat(),
+            'environment': environment(),
+            'params': params,
+            'runs': runs,
+        }, f, indent=2, ensure_ascii=False)
+    return path
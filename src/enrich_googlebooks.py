@@ -2,75 +2,290 @@
 Enriquecimiento con Google Books API -> landing/googlebooks_books.csv
 
 Notas:
-- Lee los libros desde landing/goodreads_books.json generado por el scraper.
-- Reintentos: 5 intentos por libro ante errores de conexión o respuesta, con 5s entre cada intento.
+- Lee los libros desde landing/goodreads_books.json generado por el scraper
+  (o goodreads_books.ndjson con GOODREADS_OUTPUT_FORMAT=ndjson), en streaming:
+  no se carga el fichero entero.
+- Reintentos: hasta 5 intentos por petición ante errores de conexión, 429 y 5xx,
+  con backoff exponencial con jitter (GB_RETRY_BASE_SECONDS, GB_RETRY_MAX_SECONDS)
+  o lo que indique Retry-After. Los demás 4xx (consulta mal formada, 404...)
+  no se reintentan.
+- Cortacircuitos: si falla una proporción GB_BREAKER_ERROR_RATE de las últimas
+  peticiones, todos los hilos se pausan GB_BREAKER_COOLDOWN_SECONDS; después
+  sale una sola petición de prueba y los demás hilos esperan a su resultado.
+- Concurrencia: ENRICH_CONCURRENCY hilos comparten una sesión keep-alive y un
+  token-bucket de GOOGLE_BOOKS_QPS peticiones/segundo (por defecto 1/RATE_LIMIT_SECONDS).
+- Caché: las respuestas se guardan en staging/googlebooks_cache.sqlite (GB_CACHE_*),
+  así que una re-ejecución sobre el mismo catálogo apenas hace peticiones HTTP.
+- Reanudable: las filas se escriben al CSV a medida que se obtienen y cada
+  ENRICH_CHECKPOINT_EVERY filas se confirma en staging/googlebooks_checkpoint.jsonl.
+  Si la ejecución se interrumpe, la siguiente continúa desde el último checkpoint
+  con los mismos lotes de ISBN, así que el CSV queda igual que sin interrupción.
+- Duplicados: en cada ejecución las consultas (normalizadas) y los libros ya
+  resueltos se memorizan en un LRU en memoria de GB_MEMO_MAX_ENTRIES entradas
+  (salvo las consultas por lotes de ISBN, que no se repiten), y las peticiones
+  iguales que coinciden en el tiempo se hacen una sola vez.
+- Lotes de ISBN: hasta GB_ISBN_BATCH_SIZE ISBN por petición (isbn:A OR isbn:B ...);
+  solo los libros sin coincidencia pasan a las búsquedas por título/autor.
+- Coincidencias: cada volumen devuelto se puntúa en una sola pasada (ISBN igual,
+  similitud de tokens del título y autores en común) y se queda el mejor. Las
+  búsquedas por título omiten el sufijo de serie de Goodreads ("(Saga, #1)"),
+  que hacía fallar intitle: y forzaba la búsqueda de respaldo.
+- Respuestas reducidas: hasta GB_MAX_RESULTS volúmenes por búsqueda y solo los
+  campos que se usan (GB_FIELDS, parámetro fields de la API).
 - CSV UTF-8 con los campos completos de Google Books + query_used.
 """
 
-import json, time, requests, os, csv
+import json, time, requests, os, csv, re, unicodedata
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import quote_plus
 from tqdm import tqdm
+from utils_http import (
+    RETRYABLE_STATUS, CircuitBreaker, TokenBucket, backoff_delay, build_session, retry_after_seconds, wire_bytes
+)
+from utils_cache import MemoCache, ResponseCache, normalize_query_url
+from utils_landing import iter_goodreads_records
+from utils_profiling import METRICS, incr, run_report, timer
 
 # Directorios base para encontrar los archivos de entrada y salida
 BASE_DIR = Path(__file__).resolve().parent.parent
 landing = BASE_DIR / 'landing'
-GOODREADS_JSON = landing / 'goodreads_books.json'
+DOCS_DIR = BASE_DIR / 'docs'
+GOODREADS_FORMAT = os.getenv('GOODREADS_OUTPUT_FORMAT', 'json').strip().lower()
+GOODREADS_JSON = landing / f'goodreads_books.{GOODREADS_FORMAT}'
 OUT_CSV = landing / 'googlebooks_books.csv'
+CHECKPOINT_PATH = Path(os.getenv('ENRICH_CHECKPOINT_PATH', str(BASE_DIR / 'staging' / 'googlebooks_checkpoint.jsonl')))
+CACHE_PATH = Path(os.getenv('GB_CACHE_PATH', str(BASE_DIR / 'staging' / 'googlebooks_cache.sqlite')))
 
 # Configuración cargada desde las variables de entorno (.env)
+def env_or(name, default):
+    # Una variable vacía en .env (p. ej. `GOOGLE_BOOKS_QPS=`) toma el valor por defecto
+    return os.getenv(name, '').strip() or default
+
 API_KEY = os.getenv('GOOGLE_BOOKS_API_KEY', '').strip()
-RATE_LIMIT = float(os.getenv('RATE_LIMIT_SECONDS', '0.8'))
-HEADERS = {'User-Agent': os.getenv('USER_AGENT', 'books-pipeline-bot/1.0')}
+RATE_LIMIT = float(env_or('RATE_LIMIT_SECONDS', '0.8'))
+USER_AGENT = os.getenv('USER_AGENT', 'books-pipeline-bot/1.0')
+# Las APIs de Google solo comprimen si el User-Agent también contiene "gzip"
+HEADERS = {
+    'User-Agent': USER_AGENT if 'gzip' in USER_AGENT else f"{USER_AGENT} (gzip)",
+    'Accept-Encoding': 'gzip',
+}
+API_URL = os.getenv('GOOGLE_BOOKS_API_URL', 'https://www.googleapis.com/books/v1/volumes')
+CONCURRENCY = max(1, int(env_or('ENRICH_CONCURRENCY', '4')))
+QPS = float(env_or('GOOGLE_BOOKS_QPS', str(1 / RATE_LIMIT if RATE_LIMIT > 0 else 0)))
+CHECKPOINT_EVERY = max(1, int(os.getenv('ENRICH_CHECKPOINT_EVERY', '100')))
+RETRY_BASE_SECONDS = float(os.getenv('GB_RETRY_BASE_SECONDS', '1'))
+RETRY_MAX_SECONDS = float(os.getenv('GB_RETRY_MAX_SECONDS', '60'))
+# La API devuelve como mucho 40 resultados por petición
+MAX_RESULTS_LIMIT = 40
+ISBN_BATCH_SIZE = min(MAX_RESULTS_LIMIT, max(1, int(os.getenv('GB_ISBN_BATCH_SIZE', '20'))))
+# Candidatos por búsqueda individual (ISBN, título+autor, título)
+SEARCH_MAX_RESULTS = min(MAX_RESULTS_LIMIT, max(1, int(os.getenv('GB_MAX_RESULTS', '10'))))
+# Proyección de la respuesta: solo los campos que leen parse_volume y
+# pick_best_item (GB_FIELDS vacío pide la respuesta completa)
+FIELDS = os.getenv(
+    'GB_FIELDS',
+    'totalItems,items(id,volumeInfo(title,subtitle,authors,publisher,publishedDate,'
+    'language,categories,industryIdentifiers),saleInfo(listPrice,retailPrice))'
+).strip()
+
+FIELDNAMES = [
+    'gb_id','title','subtitle','authors','publisher','pub_date',
+    'language','categories','isbn13','isbn10','price_amount','price_currency','query_used'
+]
+
+# Límite de peticiones y conexiones compartidos por todos los hilos
+RATE_LIMITER = TokenBucket(QPS, capacity=CONCURRENCY)
+# Una conexión por hilo; con GB_POOL_BLOCK=1 los hilos esperan conexión libre
+# en vez de abrir conexiones de usar y tirar cuando el pool se queda corto
+SESSION = build_session(
+    HEADERS,
+    pool_maxsize=max(1, int(os.getenv('GB_POOL_MAXSIZE', str(CONCURRENCY)))),
+    pool_connections=1,
+    pool_block=os.getenv('GB_POOL_BLOCK', '1') == '1'
+)
+# Pausa a todos los hilos si la API empieza a fallar (GB_BREAKER_ERROR_RATE=0 lo desactiva)
+BREAKER = CircuitBreaker(
+    error_rate=float(os.getenv('GB_BREAKER_ERROR_RATE', '0.5')),
+    window=int(os.getenv('GB_BREAKER_WINDOW', '20')),
+    min_calls=int(os.getenv('GB_BREAKER_MIN_CALLS', '10')),
+    cooldown=float(os.getenv('GB_BREAKER_COOLDOWN_SECONDS', '30'))
+)
+
+# Caché persistente de respuestas (GB_CACHE_ENABLED=0 para desactivarla)
+# Memoización en memoria de la ejecución: consultas y libros repetidos
+MEMO_MAX_ENTRIES = int(os.getenv('GB_MEMO_MAX_ENTRIES', '10000'))
+QUERY_MEMO = MemoCache(MEMO_MAX_ENTRIES)
+BOOK_MEMO = MemoCache(MEMO_MAX_ENTRIES)
+
+CACHE = None
+if os.getenv('GB_CACHE_ENABLED', '1') == '1':
+    CACHE = ResponseCache(
+        CACHE_PATH,
+        ttl_seconds=float(os.getenv('GB_CACHE_TTL_HOURS', '720')) * 3600,
+        max_bytes=int(float(os.getenv('GB_CACHE_MAX_MB', '512')) * 1024 * 1024)
+    )
 
 # -------------------------------------------------------
 # Helpers
 # -------------------------------------------------------
 
-def build_url(query):
-    url = f"https://www.googleapis.com/books/v1/volumes?q={quote_plus(query)}"
+def build_url(query, max_results=None):
+    url = f"{API_URL}?q={quote_plus(query)}"
+    if max_results:
+        url += f"&maxResults={max_results}"
+    if FIELDS:
+        url += f"&fields={quote_plus(FIELDS, safe='(),')}"
     if API_KEY:
         url += f"&key={API_KEY}"
     return url
 
-def request_google_books(url, intentos=5, espera=5):
+def request_google_books(url, intentos=5, espera=RETRY_BASE_SECONDS, session=None, memoize=True):
+    """
+    JSON de la consulta `url` o None. Una consulta ya resuelta en esta
+    ejecución (misma consulta normalizada) no se repite, y si otro hilo la
+    está pidiendo se espera a su respuesta. Con `memoize=False` la respuesta
+    no se guarda en el LRU (solo se comparte con las peticiones simultáneas).
+    El JSON es compartido: no modificarlo.
+    """
+    return QUERY_MEMO.get_or_compute(
+        normalize_query_url(url), lambda: fetch_google_books(url, intentos, espera, session),
+        cacheable=None if memoize else (lambda js: False)
+    )
+
+def fetch_google_books(url, intentos=5, espera=RETRY_BASE_SECONDS, session=None):
+    """
+    GET a la API con caché, límite de QPS y cortacircuitos. Reintenta los
+    errores de conexión, 429 y 5xx (backoff exponencial con jitter desde
+    `espera` segundos, o Retry-After); los demás 4xx devuelven None sin
+    reintentar. Devuelve el JSON o None.
+    """
+    if CACHE is not None:
+        cached = CACHE.get(url)
+        if cached is not None:
+            incr('google_books.cache_hits')
+            return cached
+
+    session = session or SESSION
     for intento in range(1, intentos + 1):
+        if intento > 1:
+            incr('google_books.retries')
+        with timer('google_books.breaker_wait'):
+            BREAKER.wait()
+        with timer('google_books.rate_limit_wait'):
+            RATE_LIMITER.acquire()
+        incr('google_books.requests')
+        delay = None
         try:
-            r = requests.get(url, headers=HEADERS, timeout=15)
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
+            with timer('google_books.request'):
+                r = session.get(url, timeout=15)
+            # Bytes recibidos (comprimidos) y del JSON ya descomprimido
+            incr('google_books.bytes_wire', wire_bytes(r))
+            incr('google_books.bytes', len(r.content))
+            if r.status_code in RETRYABLE_STATUS:
+                incr(f'google_books.status_{r.status_code}')
+                delay = retry_after_seconds(r)
+                if delay is not None:
+                    delay = min(delay, RETRY_MAX_SECONDS)
+                    if r.status_code == 429:
+                        # Cuota agotada: esperan todos los hilos, no solo este
+                        BREAKER.pause(delay)
+                raise requests.HTTPError(f"{r.status_code} {r.reason}", response=r)
+            if r.status_code >= 400:
+                # Error de la petición: reintentar no cambia la respuesta (la
+                # API sí responde, así que para el cortacircuitos es un éxito)
+                BREAKER.record(True)
+                incr(f'google_books.status_{r.status_code}')
+                print(f"[ERROR] Google Books respondió {r.status_code} {r.reason}; no se reintenta.")
+                return None
+            with timer('google_books.parse_json'):
+                js = r.json()
+        except (requests.RequestException, ValueError) as e:
+            incr('google_books.errors')
+            if BREAKER.record(False):
+                incr('google_books.breaker_opened')
+                print(f"[ADVERTENCIA] Demasiados errores de Google Books: pausa de {BREAKER.cooldown:.0f}s.")
             print(f"[ADVERTENCIA] Error intento {intento}/{intentos}: {e}")
             if intento < intentos:
-                time.sleep(espera)
+                time.sleep(delay if delay is not None else backoff_delay(intento, espera, RETRY_MAX_SECONDS))
+            continue
+        BREAKER.record(True)
+        if CACHE is not None:
+            CACHE.set(url, js)
+        return js
+    incr('google_books.failed')
     print(f"[ERROR] No se pudo obtener información tras {intentos} intentos")
     return None
 
-def pick_best_item(js, title=None, author=None):
-    if not js or 'items' not in js or len(js['items']) == 0:
+def normalize_isbn(isbn):
+    if not isbn:
         return None
-    items = js['items']
-    # Match título+autor
-    if title and author:
-        for it in items:
-            vol = it.get('volumeInfo', {})
-            t = (vol.get('title') or "").lower()
-            a = ";".join(vol.get('authors', [])).lower()
-            if title.lower() in t and author.lower() in a:
-                return it
-    # Match título
-    if title:
-        for it in items:
-            t = (it.get('volumeInfo', {}).get('title') or "").lower()
-            if title.lower() in t:
-                return it
-    # Match autor
-    if author:
-        for it in items:
-            a = ";".join(it.get('volumeInfo', {}).get('authors', [])).lower()
-            if author.lower() in a:
-                return it
-    return items[0]
+    return str(isbn).replace('-', '').replace(' ', '').upper() or None
+
+# Sufijo de serie de los títulos de Goodreads: "Título (Saga, #1)"
+SERIES_SUFFIX_RE = re.compile(r'\s*\([^()]*#\s*\d[^()]*\)\s*$')
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+# Peso de cada señal en la puntuación de un volumen
+ISBN_WEIGHT, TITLE_WEIGHT, AUTHOR_WEIGHT = 4.0, 2.0, 1.0
+
+def clean_title(title):
+    """Título sin el sufijo de serie de Goodreads, para buscar y comparar."""
+    return SERIES_SUFFIX_RE.sub('', title or '').strip()
+
+def tokens(text):
+    """Conjunto de palabras en minúsculas y sin tildes."""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return frozenset(TOKEN_RE.findall(text.lower()))
+
+def title_similarity(wanted, found):
+    """
+    Similitud de conjuntos de tokens entre 0 y 1: media entre la parte del
+    título más corto contenida en el otro (un título con subtítulo sigue
+    coincidiendo) y el índice de Jaccard (penaliza títulos de una palabra).
+    """
+    if not wanted or not found:
+        return 0.0
+    common = len(wanted & found)
+    return (common / min(len(wanted), len(found)) + common / len(wanted | found)) / 2
+
+def author_overlap(wanted, authors):
+    """Parte de los tokens del autor buscado presentes en alguno de `authors`."""
+    if not wanted:
+        return 0.0
+    return max((len(wanted & tokens(a)) / len(wanted) for a in authors or []), default=0.0)
+
+def item_isbns(item):
+    return {
+        normalize_isbn(i.get('identifier'))
+        for i in item.get('volumeInfo', {}).get('industryIdentifiers', []) or []
+    } - {None}
+
+def pick_best_item(js, title=None, author=None, isbns=()):
+    """
+    Mejor volumen de la respuesta para el libro buscado, o None si no hay
+    ninguno. Los datos del libro se normalizan una vez y cada volumen se
+    puntúa en una sola pasada: ISBN igual, similitud del título y solapamiento
+    de autores. A igual puntuación gana el primero (el orden de relevancia de
+    la API), así que sin ninguna señal se devuelve el primero.
+    """
+    if not js or not js.get('items'):
+        return None
+    wanted_title = tokens(clean_title(title))
+    wanted_author = tokens(author)
+    wanted_isbns = {normalize_isbn(i) for i in isbns} - {None}
+
+    best, best_score = None, -1.0
+    for it in js['items']:
+        vol = it.get('volumeInfo', {})
+        score = TITLE_WEIGHT * title_similarity(wanted_title, tokens(vol.get('title')))
+        score += AUTHOR_WEIGHT * author_overlap(wanted_author, vol.get('authors'))
+        if wanted_isbns and wanted_isbns & item_isbns(it):
+            score += ISBN_WEIGHT
+        if score > best_score:
+            best, best_score = it, score
+    return best
 
 def parse_volume(item):
     vol = item.get('volumeInfo', {})
@@ -120,87 +335,277 @@ def parse_volume(item):
 # MAIN
 # -------------------------------------------------------
 
+def book_memo_key(b, try_isbn):
+    # Libros iguales salvo mayúsculas, espacios o sufijo de serie hacen las mismas consultas
+    title = ' '.join(clean_title(b.get('title')).lower().split())
+    author = ' '.join((b.get('author') or '').lower().split())
+    return try_isbn, normalize_isbn(b.get('isbn13')), normalize_isbn(b.get('isbn10')), title, author
+
+def enrich_book(b, try_isbn=True):
+    """
+    Enriquece un libro de Goodreads con la cadena ISBN -> título+autor -> título.
+    Con `try_isbn=False` se omite la búsqueda por ISBN (ya resuelta en lote).
+    Devuelve la fila del CSV (campos de Google Books + query_used). Los libros
+    repetidos en la ejecución reutilizan la fila del primero, salvo si alguna
+    de sus peticiones falló.
+    """
+    row, _ = BOOK_MEMO.get_or_compute(
+        book_memo_key(b, try_isbn), lambda: lookup_book(b, try_isbn), cacheable=lambda value: value[1]
+    )
+    return dict(row)
+
+def lookup_book(b, try_isbn=True):
+    """
+    Cadena de búsquedas de enrich_book. Devuelve (fila, completa): completa es
+    False si alguna petición falló, y entonces la fila (p. ej. sin resultado)
+    no es una respuesta definitiva de la API.
+    """
+    title = b.get('title', '')
+    author = b.get('author', '')
+    isbn_scraper = b.get('isbn13') or b.get('isbn10')
+    isbns = (b.get('isbn13'), b.get('isbn10'))
+    # Sin el sufijo de serie, intitle: encuentra el libro y no hace falta el respaldo
+    query_title = clean_title(title)
+
+    result = None
+    url_api_utilizada = None
+    failed = False
+
+    # Buscar por ISBN
+    if isbn_scraper and try_isbn:
+        url = build_url(f"isbn:{isbn_scraper}", max_results=SEARCH_MAX_RESULTS)
+        js = request_google_books(url)
+        failed = failed or js is None
+        if js:
+            item = pick_best_item(js, title, author, isbns)
+            if item:
+                result = parse_volume(item)
+                url_api_utilizada = url
+
+    # Buscar por título+autor
+    if not result and query_title and author:
+        url = build_url(f'intitle:"{query_title}"+inauthor:"{author}"', max_results=SEARCH_MAX_RESULTS)
+        js = request_google_books(url)
+        failed = failed or js is None
+        if js:
+            item = pick_best_item(js, title, author, isbns)
+            if item:
+                result = parse_volume(item)
+                url_api_utilizada = url
+
+    # Fallback: solo título
+    if not result and query_title:
+        url = build_url(f'intitle:"{query_title}"', max_results=SEARCH_MAX_RESULTS)
+        js = request_google_books(url)
+        failed = failed or js is None
+        if js:
+            item = pick_best_item(js, title, None, isbns)
+            if item:
+                result = parse_volume(item)
+                url_api_utilizada = url
+
+    if not result:
+        result = {
+            'gb_id': None,
+            'title': None,
+            'subtitle': None,
+            'authors': None,
+            'publisher': None,
+            'pub_date': None,
+            'language': None,
+            'categories': None,
+            'isbn13': "NO_ISBN_GOOGLE_API",
+            'isbn10': None,
+            'price_amount': None,
+            'price_currency': None
+        }
+
+    # Guardar solo los campos de Google Books + query utilizada
+    row = result.copy()
+    row['query_used'] = url_api_utilizada
+    return row, not failed
+
+def enrich_batch(books):
+    """
+    Enriquece un lote de libros con una sola petición `isbn:A OR isbn:B ...`.
+    Los volúmenes devueltos se reparten a cada libro por los ISBN que extrae
+    parse_volume; los libros sin coincidencia siguen la cadena título+autor ->
+    título de enrich_book. Devuelve las filas en el orden del lote.
+    """
+    book_isbns = [
+        [i for i in (normalize_isbn(b.get('isbn13')), normalize_isbn(b.get('isbn10'))) if i]
+        for b in books
+    ]
+    # El libro se busca por el mismo ISBN que usaría enrich_book
+    query_isbns = list(dict.fromkeys(isbns[0] for isbns in book_isbns if isbns))
+    if len(query_isbns) <= 1:
+        return [enrich_book(b) for b in books]
+
+    url = build_url(' OR '.join(f"isbn:{i}" for i in query_isbns), max_results=MAX_RESULTS_LIMIT)
+    # Cada combinación de ISBN es casi única y su respuesta grande (hasta 40
+    # volúmenes): guardarla en el LRU solo ocuparía memoria
+    js = request_google_books(url, memoize=False)
+    if js is None:
+        return [enrich_book(b) for b in books]
+
+    # Índice ISBN -> volúmenes que lo contienen
+    by_isbn = {}
+    for item in js.get('items', []) or []:
+        vol = parse_volume(item)
+        for isbn in (normalize_isbn(vol['isbn13']), normalize_isbn(vol['isbn10'])):
+            if isbn:
+                by_isbn.setdefault(isbn, []).append(item)
+
+    rows = []
+    for b, isbns in zip(books, book_isbns):
+        candidates = []
+        for isbn in isbns:
+            candidates.extend(it for it in by_isbn.get(isbn, []) if it not in candidates)
+        item = pick_best_item({'items': candidates}, b.get('title', ''), b.get('author', ''), isbns) if candidates else None
+        if item:
+            row = parse_volume(item)
+            row['query_used'] = url
+        else:
+            row = enrich_book(b, try_isbn=False)
+        rows.append(row)
+    return rows
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def record_memo_stats():
+    """Pasa al informe de ejecución los aciertos de la memoización en memoria."""
+    for name, memo in (('query', QUERY_MEMO), ('book', BOOK_MEMO)):
+        stats = memo.stats()
+        for field in ('hits', 'coalesced', 'evictions'):
+            incr(f'google_books.memo_{name}.{field}', stats[field])
+        print(f"[INFO] Memoización ({name}): {stats['hits']} aciertos, {stats['coalesced']} peticiones "
+              f"compartidas, {stats['evictions']} expulsiones.")
+
+def enrich_books(books, concurrency=CONCURRENCY, batch_size=ISBN_BATCH_SIZE, done=frozenset()):
+    """
+    Enriquece los libros en lotes de `batch_size` con `concurrency` hilos y
+    devuelve pares (libro, fila) en el mismo orden de entrada. Solo se mantienen
+    en vuelo unos pocos lotes por hilo, así que la memoria no crece con el
+    tamaño del catálogo.
+
+    Al reanudar, `done` son las claves (book_key) ya escritas. Los lotes se
+    forman sobre todos los libros, igual que en la ejecución original: los
+    lotes ya escritos enteros se saltan, y del lote a medias se vuelven a
+    pedir todos sus libros aunque solo se devuelven los pendientes. Así la
+    agrupación de ISBN y query_used no cambian al reanudar.
+    """
+    chunks = (chunk for chunk in chunked(books, batch_size) if not all(book_key(b) in done for b in chunk))
+
+    def pending(chunk, rows):
+        return ((b, row) for b, row in zip(chunk, rows) if book_key(b) not in done)
+
+    if concurrency <= 1:
+        for chunk in chunks:
+            yield from pending(chunk, enrich_batch(chunk))
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        queued = deque()
+        for chunk in chunks:
+            queued.append((chunk, pool.submit(enrich_batch, chunk)))
+            if len(queued) >= concurrency * 2:
+                chunk_done, fut = queued.popleft()
+                yield from pending(chunk_done, fut.result())
+        while queued:
+            chunk_done, fut = queued.popleft()
+            yield from pending(chunk_done, fut.result())
+
+# -------------------------------------------------------
+# Checkpoint
+# -------------------------------------------------------
+
+def book_key(b):
+    """Clave estable de un libro de Goodreads para el checkpoint."""
+    return b.get('book_url') or b.get('isbn13') or b.get('isbn10') or f"{b.get('title', '')}|{b.get('author', '')}"
+
+def load_checkpoint(path):
+    """
+    Lee el checkpoint: claves ya escritas y tamaño confirmado del CSV (en bytes).
+    Una última línea a medias (caída durante la escritura) se ignora.
+    """
+    done, offset = set(), None
+    if not path.exists():
+        return done, offset
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            done.update(entry['keys'])
+            offset = entry['offset']
+    return done, offset
+
+def commit_checkpoint(csv_file, ckpt_file, keys):
+    """Vuelca el CSV a disco y registra su tamaño junto a las claves escritas."""
+    csv_file.flush()
+    os.fsync(csv_file.fileno())
+    ckpt_file.write(json.dumps({'offset': csv_file.tell(), 'keys': keys}, ensure_ascii=False) + '\n')
+    ckpt_file.flush()
+    os.fsync(ckpt_file.fileno())
+
 def main():
     if not GOODREADS_JSON.exists():
         raise SystemExit(f"[ERROR] No se encontró {GOODREADS_JSON}. Ejecuta primero el scraper de Goodreads.")
 
-    data = json.load(open(GOODREADS_JSON, 'r', encoding='utf-8'))
-    books = data.get('data', [])
-    rows = []
-
-    for b in tqdm(books, desc="Enriqueciendo con Google Books"):
-        title = b.get('title', '')
-        author = b.get('author', '')
-        isbn_scraper = b.get('isbn13') or b.get('isbn10')
-
-        result = None
-        url_api_utilizada = None
-
-        # Buscar por ISBN
-        if isbn_scraper:
-            url = build_url(f"isbn:{isbn_scraper}")
-            js = request_google_books(url)
-            if js:
-                item = pick_best_item(js, title, author)
-                if item:
-                    result = parse_volume(item)
-                    url_api_utilizada = url
-
-        # Buscar por título+autor
-        if not result and title and author:
-            url = build_url(f'intitle:"{title}"+inauthor:"{author}"')
-            js = request_google_books(url)
-            if js:
-                item = pick_best_item(js, title, author)
-                if item:
-                    result = parse_volume(item)
-                    url_api_utilizada = url
-
-        # Fallback: solo título
-        if not result and title:
-            url = build_url(f'intitle:"{title}"')
-            js = request_google_books(url)
-            if js:
-                item = pick_best_item(js, title, None)
-                if item:
-                    result = parse_volume(item)
-                    url_api_utilizada = url
-
-        if not result:
-            result = {
-                'gb_id': None,
-                'title': None,
-                'subtitle': None,
-                'authors': None,
-                'publisher': None,
-                'pub_date': None,
-                'language': None,
-                'categories': None,
-                'isbn13': "NO_ISBN_GOOGLE_API",
-                'isbn10': None,
-                'price_amount': None,
-                'price_currency': None
-            }
-
-        # Guardar solo los campos de Google Books + query utilizada
-        row = result.copy()
-        row['query_used'] = url_api_utilizada
-        rows.append(row)
+    # Lectura en streaming (en NDJSON, solo la última versión de cada libro)
+    books = iter_goodreads_records(GOODREADS_JSON)
 
-        time.sleep(RATE_LIMIT)
+    # Reanudar si hay un checkpoint de una ejecución interrumpida
+    done, offset = load_checkpoint(CHECKPOINT_PATH)
+    resume = offset is not None and OUT_CSV.exists()
+    if resume:
+        # Descartar filas escritas después del último checkpoint
+        with open(OUT_CSV, 'r+b') as f:
+            f.truncate(offset)
+        print(f"[INFO] Reanudando: {len(done)} libros ya enriquecidos en {OUT_CSV}.")
+    else:
+        done = set()
+    CHECKPOINT_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-    # Guardar CSV
-    fieldnames = [
-        'gb_id','title','subtitle','authors','publisher','pub_date',
-        'language','categories','isbn13','isbn10','price_amount','price_currency','query_used'
-    ]
+    written = 0
+    with open(OUT_CSV, 'a' if resume else 'w', encoding='utf-8', newline='') as f, \
+         open(CHECKPOINT_PATH, 'a' if resume else 'w', encoding='utf-8') as ckpt:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        if not resume:
+            writer.writeheader()
+        batch_keys = []
+        progress = tqdm(enrich_books(books, done=done), initial=len(done),
+                        desc="Enriqueciendo con Google Books")
+        for b, row in progress:
+            writer.writerow(row)
+            batch_keys.append(book_key(b))
+            written += 1
+            if len(batch_keys) >= CHECKPOINT_EVERY:
+                commit_checkpoint(f, ckpt, batch_keys)
+                batch_keys = []
+        commit_checkpoint(f, ckpt, batch_keys)
 
-    with open(OUT_CSV, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    # Ejecución completa: la próxima empieza de cero
+    CHECKPOINT_PATH.unlink()
 
-    print(f"[OK] Archivo generado: {OUT_CSV} ({len(rows)} filas).")
+    print(f"[OK] Archivo generado: {OUT_CSV} ({len(done) + written} filas).")
+    record_memo_stats()
+    counters = METRICS.snapshot()['counters']
+    print(f"[INFO] Google Books: {counters.get('google_books.requests', 0)} peticiones, "
+          f"{counters.get('google_books.bytes_wire', 0) / 1024 / 1024:.1f} MB transferidos "
+          f"({counters.get('google_books.bytes', 0) / 1024 / 1024:.1f} MB sin comprimir).")
+    if CACHE is not None:
+        stats = CACHE.stats()
+        print(f"[INFO] Caché Google Books: {stats['hits']} aciertos, {stats['misses']} fallos "
+              f"({stats['hit_rate']*100:.1f}%), {stats['evictions']} expulsiones.")
 
 if __name__ == '__main__':
-    main()
+    with run_report('enrich_googlebooks', DOCS_DIR):
+        main()
@@ -1,19 +1,33 @@
 # src/integrate_pipeline.py
+"""
+Integración de Goodreads y Google Books -> standard/dim_book.parquet
+
+Uso como script (lee landing/ y escribe standard/ y docs/):
+    python src/integrate_pipeline.py
+
+Uso como librería (sin efectos al importar):
+    from integrate_pipeline import run
+    result = run(df_gr, df_gb)                   # todo en memoria
+    result = run(df_gr, df_gb, out_dir=BASE_DIR) # además escribe standard/ y docs/
+"""
 
 import json
+import os
 import pandas as pd
 import pyarrow as pa
-import pyarrow.parquet as pq
 import numpy as np
 import hashlib
 import re
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 from utils_quality import calculate_quality_metrics
-from utils_isbn import validate_isbn13
-
-load_dotenv()
+from utils_isbn import validate_isbn13_array, canonicalize_isbn_array
+from utils_parquet import read_table, write_table
+from utils_landing import read_landing_table, to_pandas, GOODREADS_TYPES, GOOGLEBOOKS_TYPES
+from utils_profiling import run_report, timer
 
 # =============================================================================
 # RUTAS
@@ -24,58 +38,20 @@ STANDARD_DIR = BASE_DIR / 'standard'
 DOCS_DIR = BASE_DIR / 'docs'
 WORK_DIR = BASE_DIR / 'staging'
 
-for dir_path in [STANDARD_DIR, DOCS_DIR, WORK_DIR]:
-    dir_path.mkdir(exist_ok=True)
-
-goodreads_path = LANDING_DIR / 'goodreads_books.json'
-googlebooks_path = LANDING_DIR / 'googlebooks_books.csv'
-
-if not goodreads_path.exists():
-    raise FileNotFoundError(f"No se encontró: {goodreads_path}")
-if not googlebooks_path.exists():
-    raise FileNotFoundError(f"No se encontró: {googlebooks_path}")
-
-print(f"[INFO] Leyendo fuentes en landing/ (solo lectura)...")
-print(f"   - Goodreads: {goodreads_path}")
-print(f"   - GoogleBooks: {googlebooks_path}")
+GOODREADS_PATH = LANDING_DIR / 'goodreads_books.json'
+GOODREADS_NDJSON_PATH = LANDING_DIR / 'goodreads_books.ndjson'
+GOOGLEBOOKS_PATH = LANDING_DIR / 'googlebooks_books.csv'
 
-ingestion_ts = datetime.utcnow().isoformat()
-
-# =============================================================================
-# LEER ARCHIVOS
-# =============================================================================
-with open(goodreads_path, 'r', encoding='utf-8') as f:
-    gr_json = json.load(f)
-df_gr = pd.DataFrame(gr_json['data'])
-df_gb = pd.read_csv(googlebooks_path, encoding='utf-8')
-
-# =============================================================================
-# ASEGURAR TIPOS
-# =============================================================================
-for df in [df_gr, df_gb]:
-    for col in ['isbn10', 'isbn13']:
-        if col in df.columns:
-            df[col] = df[col].astype(str).where(df[col].notnull(), np.nan)
-    if 'validation_flag' not in df.columns:
-        df['validation_flag'] = 'valid'
-
-# =============================================================================
-# CALCULAR MÉTRICAS ANTES DE LIMPIAR
-# =============================================================================
-df_gr_for_metrics = df_gr.copy()
-df_gb_for_metrics = df_gb.copy()
-quality_metrics = calculate_quality_metrics(df_gr_for_metrics, df_gb_for_metrics)
-
-# =============================================================================
-# LIMPIEZA PREVIA: eliminar registros sin título o ISBN válido
-# =============================================================================
-df_gr = df_gr[df_gr['title'].notnull() & df_gr['isbn13'].notnull()]
-df_gb = df_gb[df_gb['title'].notnull() & df_gb['isbn13'].notnull()]
+# Artefactos dentro de <out_dir>/standard y <out_dir>/docs
+DIM_BOOK_FILE = 'dim_book.parquet'
+SOURCE_DETAIL_FILE = 'book_source_detail.parquet'
+METRICS_FILE = 'quality_metrics.json'
+SCHEMA_FILE = 'schema.md'
 
 # =============================================================================
 # RENOMBRAR COLUMNAS
 # =============================================================================
-gr_col_map = {
+GR_COL_MAP = {
     'title': 'title',
     'author': 'authors',
     'rating': 'rating',
@@ -86,7 +62,7 @@ gr_col_map = {
     'scrape_source': 'scrape_source',
     'scrape_date': 'scrape_date'
 }
-gb_col_map = {
+GB_COL_MAP = {
     'gb_id': 'gb_id',
     'title': 'title',
     'subtitle': 'subtitle',
@@ -101,11 +77,9 @@ gb_col_map = {
     'price_currency': 'price_currency',
     'query_used': 'query_used'
 }
-df_gr = df_gr.rename(columns=gr_col_map)
-df_gb = df_gb.rename(columns=gb_col_map)
 
 # =============================================================================
-# NORMALIZAR LISTAS Y AUTHOR PRINCIPAL
+# FUNCIONES AUXILIARES
 # =============================================================================
 def to_list(x, sep=r',|;|and'):
     if pd.isnull(x):
@@ -114,157 +88,404 @@ def to_list(x, sep=r',|;|and'):
         return [i.strip() for i in re.split(sep, x) if i.strip()]
     return list(x) if isinstance(x, list) else []
 
-df_gr['authors'] = df_gr['authors'].apply(to_list)
-if 'authors' in df_gb:
-    df_gb['authors'] = df_gb['authors'].apply(lambda x: to_list(x, sep=';'))
-if 'categories' in df_gb:
-    df_gb['categories'] = df_gb['categories'].apply(lambda x: to_list(x, sep=';'))
-
-for df in [df_gr, df_gb]:
-    if 'authors' in df:
-        df['author_principal'] = df['authors'].apply(lambda x: x[0] if len(x) > 0 else np.nan)
-
-# =============================================================================
-# FUNCIONES AUXILIARES
-# =============================================================================
-def choose_field(gr_val, gb_val):
-    if isinstance(gr_val, list) and len(gr_val) == 0:
-        gr_val = None
-    if isinstance(gb_val, list) and len(gb_val) == 0:
-        gb_val = None
-    return gr_val if pd.notnull(gr_val) else gb_val
-
 def normalize_text(x):
     if pd.isnull(x):
         return np.nan
     return ' '.join(str(x).strip().lower().split())
 
-# =============================================================================
-# CREAR DF UNIFICADO
-# =============================================================================
-merged_records = []
-
-df_gr['_key'] = df_gr['isbn13'].combine_first(df_gr['isbn10'])
-df_gb['_key'] = df_gb['isbn13'].combine_first(df_gb['isbn10'])
-all_keys = set(df_gr['_key'].dropna()) | set(df_gb['_key'].dropna())
+def to_iso_date(pub_date):
+    try:
+        return pd.to_datetime(pub_date, errors='coerce').strftime('%Y-%m-%d') if pub_date else np.nan
+    except:
+        return np.nan
 
-for key in all_keys:
-    gr_row = df_gr[df_gr['_key'] == key].iloc[0] if key in df_gr['_key'].values else None
-    gb_row = df_gb[df_gb['_key'] == key].iloc[0] if key in df_gb['_key'].values else None
+def map_unique(series, func):
+    """
+    Aplica `func` una sola vez por valor distinto de la columna (los nulos
+    se pasan a `func` una única vez) y reparte el resultado a todas las filas.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    values = np.empty(len(uniques) + 1, dtype=object)
+    values[:-1] = [func(u) for u in uniques]
+    values[-1] = func(np.nan)
+    return pd.Series(values[codes], index=series.index).infer_objects()
+
+def _hashable(values):
+    # Listas (o arrays leídos de Parquet) se comparan por su contenido
+    if values.dtype != object:
+        return values
+    return values.map(
+        lambda v: '\x1f'.join(map(str, v)) if isinstance(v, (list, np.ndarray)) else v,
+        na_action='ignore'
+    )
+
+def row_hash(df, exclude=()):
+    """
+    Hash de contenido (uint64) de cada fila, estable entre ejecuciones. Se
+    ignoran las columnas internas (prefijo `_`) y las indicadas en `exclude`.
+    """
+    cols = sorted(c for c in df.columns if not c.startswith('_') and c not in exclude)
+    frame = pd.DataFrame({c: _hashable(df[c]) for c in cols}, index=df.index)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+def choose_column(merged, col):
+    """
+    Elige el campo `col` para todas las claves a la vez sobre el resultado del
+    outer join: valor de Goodreads si no es nulo (ni lista vacía), si no el de
+    Google Books.
+    """
+    def side(suffix):
+        name = f'{col}{suffix}'
+        if name not in merged:
+            return pd.Series(None, index=merged.index, dtype=object)
+        values = merged[name]
+        if values.dtype == object:
+            empty = values.map(lambda v: isinstance(v, list) and len(v) == 0, na_action='ignore')
+            values = values.mask(empty.fillna(False).astype(bool), None)
+        return values
+
+    gr_val, gb_val = side('_gr'), side('_gb')
+    if gr_val.dtype != gb_val.dtype:
+        gr_val, gb_val = gr_val.astype(object), gb_val.astype(object)
+    return gr_val.where(gr_val.notnull(), gb_val)
+
+def merge_sources(df_gr, df_gb, ingestion_ts):
+    """
+    Une Goodreads y Google Books por `_key` con un único outer join (hash join)
+    en lugar de buscar cada clave en ambos DataFrames. Para cada clave se usa
+    la primera fila de cada fuente y cada campo se resuelve columna a columna.
+    """
+    gr_first = df_gr.dropna(subset=['_key']).drop_duplicates('_key', keep='first')
+    gb_first = df_gb.dropna(subset=['_key']).drop_duplicates('_key', keep='first')
+    gr_first = gr_first.set_index('_key').add_suffix('_gr')
+    gb_first = gb_first.set_index('_key').add_suffix('_gb')
+    gr_first['_in_gr'] = True
+    merged = gr_first.join(gb_first, how='outer')
+    in_gr = merged['_in_gr'].notnull().to_numpy()
 
-    record = {}
     # Título
-    record['title'] = choose_field(gr_row.get('title') if gr_row is not None else None,
-                                   gb_row.get('title') if gb_row is not None else None)
-    record['title_normalized'] = normalize_text(record['title'])
+    title = choose_column(merged, 'title')
     # Autores
-    authors = choose_field(gr_row.get('authors') if gr_row is not None else None,
-                           gb_row.get('authors') if gb_row is not None else None)
-    record['authors'] = authors if authors else []
-    record['author_principal'] = authors[0] if authors else np.nan
-    # Editorial
-    record['publisher'] = choose_field(gr_row.get('publisher') if gr_row is not None else None,
-                                       gb_row.get('publisher') if gb_row is not None else None)
+    authors = choose_column(merged, 'authors').map(lambda x: x if isinstance(x, list) and x else [])
     # Fecha ISO
-    pub_date = choose_field(gr_row.get('pub_date') if gr_row is not None else None,
-                            gb_row.get('pub_date') if gb_row is not None else None)
-    try:
-        record['pub_date_iso'] = pd.to_datetime(pub_date, errors='coerce').strftime('%Y-%m-%d') if pub_date else np.nan
-        record['year_pub'] = int(record['pub_date_iso'][:4]) if pd.notnull(record['pub_date_iso']) else np.nan
-    except:
-        record['pub_date_iso'] = np.nan
-        record['year_pub'] = np.nan
-    # Idioma
-    record['language_bcp'] = normalize_text(choose_field(gr_row.get('language') if gr_row is not None else None,
-                                                        gb_row.get('language') if gb_row is not None else None))
+    pub_date_iso = map_unique(choose_column(merged, 'pub_date'), to_iso_date)
+    year_pub = map_unique(pub_date_iso, lambda d: int(d[:4]) if pd.notnull(d) else np.nan)
     # ISBN
-    record['isbn10'] = choose_field(gr_row.get('isbn10') if gr_row is not None else None,
-                                    gb_row.get('isbn10') if gb_row is not None else None)
-    record['isbn13'] = choose_field(gr_row.get('isbn13') if gr_row is not None else None,
-                                    gb_row.get('isbn13') if gb_row is not None else None)
-    # Precio
-    record['price'] = choose_field(gr_row.get('price_amount') if gr_row is not None else None,
-                                   gb_row.get('price_amount') if gb_row is not None else None)
-    record['currency_iso'] = normalize_text(choose_field(gr_row.get('price_currency') if gr_row is not None else None,
-                                                         gb_row.get('price_currency') if gb_row is not None else None))
+    isbn10 = choose_column(merged, 'isbn10')
+    isbn13 = choose_column(merged, 'isbn13')
+    isbn13_present = isbn13.notnull() & (isbn13.astype(object) != '')
+    isbn13_valid = pd.Series(validate_isbn13_array(isbn13), index=isbn13.index) & isbn13_present
     # Categorías
-    cats = choose_field(gr_row.get('categories') if gr_row is not None else None,
-                        gb_row.get('categories') if gb_row is not None else None)
-    record['categories'] = cats if cats else []
-    # Validación ISBN
-    record['isbn13_valid'] = validate_isbn13(record['isbn13']) if record['isbn13'] else False
-    record['validation_flag'] = 'invalid_isbn' if record['isbn13'] and not record['isbn13_valid'] else 'valid'
-    # Fuente y timestamp
-    record['fuente_ganadora'] = 'goodreads' if gr_row is not None else 'googlebooks'
-    record['ts_last_update'] = ingestion_ts
-
-    merged_records.append(record)
-
-df_dim_book = pd.DataFrame(merged_records)
-
-# Detalle por fuente
-df_gr['_source_name'] = 'goodreads'
-df_gr['_ingestion_ts'] = ingestion_ts
-df_gb['_source_name'] = 'googlebooks'
-df_gb['_ingestion_ts'] = ingestion_ts
-df_source_detail = pd.concat([df_gr, df_gb], ignore_index=True, sort=False)
+    categories = choose_column(merged, 'categories').map(lambda x: x if isinstance(x, list) and x else [])
+
+    df_merged = pd.DataFrame({
+        'title': title,
+        'title_normalized': map_unique(title, normalize_text),
+        'authors': authors,
+        'author_principal': authors.map(lambda x: x[0] if x else np.nan),
+        'publisher': choose_column(merged, 'publisher'),
+        'pub_date_iso': pub_date_iso,
+        'year_pub': year_pub,
+        'language_bcp': map_unique(choose_column(merged, 'language'), normalize_text),
+        'isbn10': isbn10,
+        'isbn13': isbn13,
+        'price': choose_column(merged, 'price_amount'),
+        'currency_iso': map_unique(choose_column(merged, 'price_currency'), normalize_text),
+        'categories': categories,
+        'isbn13_valid': isbn13_valid.astype(bool),
+        'validation_flag': np.where(isbn13_present & ~isbn13_valid, 'invalid_isbn', 'valid'),
+        'fuente_ganadora': np.where(in_gr, 'goodreads', 'googlebooks'),
+        'ts_last_update': ingestion_ts,
+    })
+    return df_merged.reset_index(drop=True).infer_objects()
 
 # =============================================================================
-# DEDUPLICACIÓN Y PRIORIDAD ISBN10 DE GOOGLE
+# PREPARAR FUENTES
 # =============================================================================
-df_all = df_dim_book.copy()
-df_all['dedup_key'] = df_all['isbn13'].combine_first(df_all['isbn10'])
-df_all.sort_values(by='ts_last_update', ascending=True, inplace=True)
-
-def pick_best_record(group):
-    # Priorizar Google ISBN10
-    gb_isbn10 = group[(group['fuente_ganadora']=='googlebooks') & pd.notnull(group['isbn10'])]
-    if not gb_isbn10.empty:
-        chosen = gb_isbn10.iloc[-1]
+def ensure_types(df):
+    """ISBN como texto y `validation_flag` por defecto, sin modificar `df`."""
+    df = df.assign(**{
+        col: df[col].astype(str).where(df[col].notnull(), np.nan)
+        for col in ['isbn10', 'isbn13'] if col in df.columns
+    })
+    if 'validation_flag' not in df.columns:
+        df = df.assign(validation_flag='valid')
+    return df
+
+def prepare_sources(gr_df, gb_df, ingestion_ts, quality=None):
+    """
+    Tipos, métricas de calidad (antes de limpiar), limpieza, renombrado y
+    listas de autores/categorías. Añade a cada fila la clave `_key`, la
+    fuente, el timestamp de ingesta y el hash de contenido `_row_hash`.
+    Devuelve (df_gr, df_gb, quality_metrics); no modifica los DataFrames
+    de entrada. Con `quality` (QualityMetrics ya acumuladas, p. ej. por
+    lotes) las métricas son esas en lugar de las de gr_df/gb_df.
+    """
+    df_gr, df_gb = ensure_types(gr_df), ensure_types(gb_df)
+
+    # Métricas antes de limpiar (no modifica los DataFrames: no hace falta copiarlos)
+    if quality is None:
+        quality_metrics = calculate_quality_metrics(df_gr, df_gb)
     else:
-        chosen = group.iloc[-1]
-    return chosen
+        quality_metrics = quality.to_dict()
+
+    # Limpieza previa: eliminar registros sin título o ISBN válido
+    df_gr = df_gr[df_gr['title'].notnull() & df_gr['isbn13'].notnull()]
+    df_gb = df_gb[df_gb['title'].notnull() & df_gb['isbn13'].notnull()]
 
-df_dim_book = df_all.groupby('dedup_key', group_keys=False).apply(pick_best_record).reset_index(drop=True)
+    df_gr = df_gr.rename(columns=GR_COL_MAP)
+    df_gb = df_gb.rename(columns=GB_COL_MAP)
 
-# Generar book_id_chosen priorizando ISBN10 de Google
-def generate_book_id(row):
-    if pd.notnull(row.get('isbn10')) and row.get('fuente_ganadora') == 'googlebooks':
-        return row['isbn10']
-    if pd.notnull(row.get('isbn13')):
-        return row['isbn13']
-    key_str = f"{row.get('title','')}_{row.get('author_principal','')}_{row.get('publisher','')}_{row.get('pub_date_iso','')}"
-    return hashlib.sha256(key_str.encode()).hexdigest()[:16]
+    # Normalizar listas y autor principal
+    df_gr['authors'] = df_gr['authors'].apply(to_list)
+    if 'authors' in df_gb:
+        df_gb['authors'] = df_gb['authors'].apply(lambda x: to_list(x, sep=';'))
+    if 'categories' in df_gb:
+        df_gb['categories'] = df_gb['categories'].apply(lambda x: to_list(x, sep=';'))
 
-df_dim_book['book_id_chosen'] = df_dim_book.apply(generate_book_id, axis=1)
+    for df, source in [(df_gr, 'goodreads'), (df_gb, 'googlebooks')]:
+        if 'authors' in df:
+            df['author_principal'] = df['authors'].apply(lambda x: x[0] if len(x) > 0 else np.nan)
+        df['_key'] = df['isbn13'].combine_first(df['isbn10'])
+        # Detalle por fuente (con hash de contenido para detectar cambios)
+        df['_source_name'] = source
+        df['_ingestion_ts'] = ingestion_ts
+        df['_row_hash'] = row_hash(df)
 
-# Marcar registros elegidos en detalle de fuente
-df_source_detail['_chosen'] = df_source_detail.apply(
-    lambda row: row.get('isbn10') in df_dim_book['book_id_chosen'].values or
-                row.get('isbn13') in df_dim_book['book_id_chosen'].values,
-    axis=1
-)
+    return df_gr, df_gb, quality_metrics
 
 # =============================================================================
-# CALCULAR MÉTRICAS FINALES
+# DEDUPLICACIÓN Y PRIORIDAD ISBN10 DE GOOGLE
 # =============================================================================
-quality_metrics['duplicados_encontrados'] = len(df_source_detail) - len(df_dim_book)
+def book_dedup_key(isbn13, isbn10):
+    """
+    Clave de deduplicación: ISBN-13 canónico (un ISBN-10 válido se convierte a
+    su ISBN-13, así ambas formas del mismo libro coinciden). Si ninguno es
+    válido se usa el identificador tal cual.
+    """
+    canonical = canonicalize_isbn_array(isbn13).combine_first(canonicalize_isbn_array(isbn10))
+    return canonical.combine_first(isbn13).combine_first(isbn10)
+
+def deduplicate_books(df):
+    """
+    Un registro por clave de deduplicación. Se prioriza el registro de Google
+    Books con ISBN-10 y, dentro de la misma prioridad, el más reciente
+    (`ts_last_update`). El resultado queda ordenado por clave.
+    """
+    dedup_key = book_dedup_key(df['isbn13'], df['isbn10'])
+    prefer = (df['fuente_ganadora'] == 'googlebooks') & df['isbn10'].notnull()
+    ranked = df.assign(_dedup_key=dedup_key, _prefer=prefer)
+    ranked = ranked[ranked['_dedup_key'].notnull()]
+    ranked = ranked.sort_values(['_dedup_key', '_prefer', 'ts_last_update'], kind='mergesort')
+    ranked = ranked.drop_duplicates('_dedup_key', keep='last')
+    return ranked.drop(columns=['_dedup_key', '_prefer']).reset_index(drop=True)
+
+def assign_book_ids(df):
+    """
+    book_id_chosen priorizando ISBN-10 de Google, luego ISBN-13 y, sin ISBN,
+    un hash de título, autor, editorial y fecha.
+    """
+    use_isbn10 = df['isbn10'].notnull() & (df['fuente_ganadora'] == 'googlebooks')
+    book_id = df['isbn10'].where(use_isbn10, df['isbn13']).astype(object)
+    missing = book_id.isnull()
+    if missing.any():
+        rows = df.loc[missing, ['title', 'author_principal', 'publisher', 'pub_date_iso']]
+        book_id[missing] = [
+            hashlib.sha256(f"{t}_{a}_{p}_{d}".encode()).hexdigest()[:16]
+            for t, a, p, d in rows.itertuples(index=False, name=None)
+        ]
+    return book_id.infer_objects()
 
 # =============================================================================
-# EMITIR ARTEFACTOS
+# ESQUEMA DE SALIDA
 # =============================================================================
-dim_book_path = STANDARD_DIR / 'dim_book.parquet'
-source_detail_path = STANDARD_DIR / 'book_source_detail.parquet'
-metrics_path = DOCS_DIR / 'quality_metrics.json'
-schema_path = DOCS_DIR / 'schema.md'
+# Esquema explícito de dim_book: listas tipadas y columnas de baja
+# cardinalidad codificadas como diccionario
+LOW_CARDINALITY = pa.dictionary(pa.int32(), pa.string())
+DIM_BOOK_SCHEMA = pa.schema([
+    ('title', pa.string()),
+    ('title_normalized', pa.string()),
+    ('authors', pa.list_(pa.string())),
+    ('author_principal', pa.string()),
+    ('publisher', pa.string()),
+    ('pub_date_iso', pa.string()),
+    ('year_pub', pa.int32()),
+    ('language_bcp', LOW_CARDINALITY),
+    ('isbn10', pa.string()),
+    ('isbn13', pa.string()),
+    ('price', pa.float64()),
+    ('currency_iso', LOW_CARDINALITY),
+    ('categories', pa.list_(pa.string())),
+    ('isbn13_valid', pa.bool_()),
+    ('validation_flag', pa.string()),
+    ('fuente_ganadora', LOW_CARDINALITY),
+    ('ts_last_update', pa.string()),
+    ('book_id_chosen', pa.string()),
+])
+
+def dim_book_table(df):
+    """
+    Tabla Arrow de dim_book con DIM_BOOK_SCHEMA. Las columnas de texto sin
+    ningún valor (pandas las deja como float) se pasan a object antes de
+    convertir.
+    """
+    empty_text = {
+        f.name: df[f.name].astype(object)
+        for f in DIM_BOOK_SCHEMA
+        if (pa.types.is_string(f.type) or pa.types.is_dictionary(f.type))
+        and df[f.name].dtype.kind == 'f'
+    }
+    return pa.Table.from_pandas(df.assign(**empty_text), schema=DIM_BOOK_SCHEMA, preserve_index=False)
 
-pq.write_table(pa.Table.from_pandas(df_dim_book), dim_book_path)
-pq.write_table(pa.Table.from_pandas(df_source_detail), source_detail_path)
+# =============================================================================
+# MODO INCREMENTAL: UPSERT SOBRE LAS TABLAS EXISTENTES
+# =============================================================================
+# Campos de dim_book que no forman parte del contenido del libro
+DIM_VOLATILE_COLUMNS = ('ts_last_update', 'book_id_chosen')
+# Columnas derivadas del detalle que se recalculan en cada ejecución
+DETAIL_DERIVED_COLUMNS = ['_chosen', 'book_id_chosen']
+
+def load_previous_tables(standard_dir):
+    """
+    dim_book y detalle de la ejecución anterior en `standard_dir`, o None si
+    no existen o se generaron sin hash de contenido (en ese caso se
+    reconstruye todo).
+    """
+    dim_book_path = standard_dir / DIM_BOOK_FILE
+    source_detail_path = standard_dir / SOURCE_DETAIL_FILE
+    if not dim_book_path.exists() or not source_detail_path.exists():
+        print(f"[INFO] No hay tablas previas en standard/: integración completa.")
+        return None
+    prev_detail = pd.read_parquet(source_detail_path)
+    if '_row_hash' not in prev_detail.columns:
+        print(f"[INFO] Tablas previas sin '_row_hash': integración completa.")
+        return None
+    return read_table(dim_book_path, DIM_BOOK_SCHEMA).to_pandas(), prev_detail
+
+def changed_keys(detail, prev_detail):
+    """Claves `_key` con algún registro de landing nuevo o modificado (por hash)."""
+    seen = pd.MultiIndex.from_arrays([detail['_source_name'], detail['_row_hash']]).isin(
+        pd.MultiIndex.from_arrays([prev_detail['_source_name'], prev_detail['_row_hash']])
+    )
+    return pd.Index(detail.loc[~seen, '_key'].dropna().unique())
+
+# Identificador de cada registro de landing por fuente: sigue siendo el mismo
+# registro aunque cambie su ISBN (y con él su `_key`)
+RECORD_ID_COLUMNS = {'goodreads': 'book_url', 'googlebooks': 'gb_id'}
+
+def stale_rows(detail, prev_detail, input_ids=None):
+    """
+    Máscara de las filas de `prev_detail` que ya no corresponden a ningún
+    registro de landing. Si `detail` es el landing completo, las que no
+    están en él (por hash): registros que han salido del landing o cuya
+    clave ha cambiado. Si es solo una parte, `input_ids` (fuente ->
+    identificadores de los registros de entrada, antes de descartar los que
+    no tienen título o ISBN) y solo se retiran las filas de esos registros
+    que ya no tienen la misma `_key` en `detail`.
+    """
+    if input_ids is None:
+        return ~pd.MultiIndex.from_arrays([prev_detail['_source_name'], prev_detail['_row_hash']]).isin(
+            pd.MultiIndex.from_arrays([detail['_source_name'], detail['_row_hash']])
+        )
+    stale = np.zeros(len(prev_detail), dtype=bool)
+    for source, column in RECORD_ID_COLUMNS.items():
+        rows = (prev_detail['_source_name'] == source).to_numpy()
+        prev, new = prev_detail[rows], detail[detail['_source_name'] == source]
+        moved = ~pd.MultiIndex.from_arrays([prev[column], prev['_key']]).isin(
+            pd.MultiIndex.from_arrays([new[column], new['_key']])
+        )
+        stale[rows] = prev[column].isin(input_ids[source].dropna()).to_numpy() & moved
+    return stale
+
+# Columnas de lista del detalle (al leerlas de Parquet llegan como arrays)
+DETAIL_LIST_COLUMNS = ('authors', 'categories')
+
+def detail_sources(detail, gr_columns, gb_columns):
+    """
+    Separa filas del detalle en (df_gr, df_gb) con la forma que da
+    prepare_sources: las columnas de cada fuente y listas de Python.
+    """
+    frames = []
+    for source, columns in (('goodreads', gr_columns), ('googlebooks', gb_columns)):
+        rows = detail.loc[detail['_source_name'] == source, columns]
+        rows = rows.assign(**{
+            col: rows[col].map(lambda x: list(x) if isinstance(x, np.ndarray) else x)
+            for col in DETAIL_LIST_COLUMNS if col in rows.columns
+        })
+        frames.append(rows)
+    return frames[0], frames[1]
+
+def upsert_books(df_gr, df_gb, detail, prev_dim, prev_detail, keys, ingestion_ts, stale=None):
+    """
+    Integra solo las claves `keys` (ambas fuentes) y retira las filas previas
+    del detalle marcadas en `stale` (ver stale_rows). Los libros afectados
+    (las claves de deduplicación de esos registros, antes y después del
+    cambio) se reconstruyen desde todos los registros del detalle que
+    comparten clave de deduplicación, igual que en una integración completa;
+    las filas previas de dim_book de esos libros se descartan, así que un
+    libro sin registros desaparece. El resto de dim_book y del detalle se
+    conserva tal cual; si el libro consolidado no cambia de contenido,
+    mantiene su `ts_last_update`.
+    Devuelve dim_book, el detalle y las filas de dim_book afectadas (antes y
+    después del cambio), que determinan qué particiones se reescriben.
+    """
+    replaced_rows = prev_detail['_key'].isin(keys).to_numpy()
+    if stale is not None:
+        replaced_rows = replaced_rows | stale
+    untouched = prev_detail[~replaced_rows].drop(columns=DETAIL_DERIVED_COLUMNS, errors='ignore')
+    changed = detail[detail['_key'].isin(keys)]
+    replaced = prev_detail[replaced_rows]
+    detail = pd.concat([untouched, changed], ignore_index=True, sort=False)
+
+    affected_keys = pd.Index(pd.concat([
+        book_dedup_key(changed['isbn13'], changed['isbn10']),
+        book_dedup_key(replaced['isbn13'], replaced['isbn10']),
+    ]).dropna().unique())
+    detail_keys = book_dedup_key(detail['isbn13'], detail['isbn10'])
+    rebuild_gr, rebuild_gb = detail_sources(
+        detail[detail_keys.isin(affected_keys).to_numpy()], df_gr.columns, df_gb.columns
+    )
+    resolved = deduplicate_books(merge_sources(rebuild_gr, rebuild_gb, ingestion_ts))
+
+    prev_keys = book_dedup_key(prev_dim['isbn13'], prev_dim['isbn10'])
+    affected = prev_keys.isin(affected_keys).to_numpy()
+    prev_affected = prev_dim[affected].drop(columns=['book_id_chosen'])
+
+    prev_ts = pd.Series(
+        prev_affected['ts_last_update'].to_numpy(),
+        index=row_hash(prev_affected, exclude=DIM_VOLATILE_COLUMNS)
+    )
+    prev_ts = prev_ts[~prev_ts.index.duplicated()]
+    kept_ts = pd.Series(row_hash(resolved, exclude=DIM_VOLATILE_COLUMNS)).map(prev_ts)
+    resolved['ts_last_update'] = kept_ts.where(kept_ts.notnull(), resolved['ts_last_update'])
+
+    resolved['book_id_chosen'] = assign_book_ids(resolved)
+    dim = pd.concat([prev_dim[~affected], resolved], ignore_index=True)
+    dim_order = np.argsort(book_dedup_key(dim['isbn13'], dim['isbn10']).to_numpy(), kind='stable')
+    dim = dim.iloc[dim_order].reset_index(drop=True)
+    return dim, detail, pd.concat([prev_affected, resolved], ignore_index=True)
 
-with open(metrics_path, 'w', encoding='utf-8') as f:
-    json.dump(quality_metrics, f, indent=4, ensure_ascii=False)
+# =============================================================================
+# DETALLE POR FUENTE
+# =============================================================================
+def link_source_detail(detail, dim_book):
+    """Marca `_chosen` y añade `book_id_chosen` (clave de unión con dim_book)."""
+    # Marcar registros elegidos en detalle de fuente (pertenencia por hash con isin)
+    chosen_ids = pd.Index(dim_book['book_id_chosen'].dropna().unique())
+    detail['_chosen'] = detail['isbn10'].isin(chosen_ids) | detail['isbn13'].isin(chosen_ids)
+
+    # Clave de unión con dim_book: libro al que se consolidó cada registro de detalle
+    dim_book_ids = pd.Series(
+        dim_book['book_id_chosen'].to_numpy(),
+        index=book_dedup_key(dim_book['isbn13'], dim_book['isbn10']).to_numpy()
+    )
+    detail['book_id_chosen'] = book_dedup_key(detail['isbn13'], detail['isbn10']).map(dim_book_ids)
+    return detail
 
-schema_content = """
+# =============================================================================
+# EMITIR ARTEFACTOS
+# =============================================================================
+SCHEMA_DOC = """
 # 📚 Schema Documentation
 
 ## dim_book.parquet
@@ -322,14 +543,220 @@ Se ha seleccionado cuidadosamente el tipo de dato y formato de cada campo para a
 
 - validation_flag: str, not null  
   Estado de validación del ISBN (`valid` / `invalid_isbn`). `str` porque representa categorías textuales; no nullable para asegurar control de calidad.
+
+## Almacenamiento
+
+- Compresión `PARQUET_COMPRESSION` (zstd por defecto) y row groups de `PARQUET_ROW_GROUP_SIZE` filas, con estadísticas min/max por row group. Las filas se escriben ordenadas por ISBN-13, así que los filtros por ISBN descartan row groups completos.
+- `language_bcp`, `currency_iso` y `fuente_ganadora` se guardan codificadas como diccionario (pocos valores distintos); se leen como `category` en pandas.
+- Con `DIM_BOOK_PARTITION_BY` (p. ej. `year_pub` o `language_bcp`), `dim_book.parquet` es un directorio con particiones hive (`year_pub=2004/...`) que los lectores pueden podar; los valores nulos van a la partición `__NULL__`.
 """
 
 
-with open(schema_path, 'w', encoding='utf-8') as f:
-    f.write(schema_content.strip())
 
-print(f"[OK] Integración completada.")
-print(f"   dim_book: {dim_book_path}")
-print(f"   detail: {source_detail_path}")
-print(f"   metrics: {metrics_path}")
-print(f"   schema: {schema_path}")
+def write_outputs(result, out_dir, touched_books=None, partition_by=None,
+                  compression='zstd', row_group_size=None):
+    """
+    Escribe dim_book y detalle en `<out_dir>/standard` y métricas y esquema en
+    `<out_dir>/docs`. Si las tablas no cambiaron no se reescriben. Devuelve
+    las rutas de los artefactos.
+    """
+    out_dir = Path(out_dir)
+    standard_dir, docs_dir = out_dir / 'standard', out_dir / 'docs'
+    for dir_path in [standard_dir, docs_dir]:
+        dir_path.mkdir(parents=True, exist_ok=True)
+    paths = {
+        'dim_book': standard_dir / DIM_BOOK_FILE,
+        'detail': standard_dir / SOURCE_DETAIL_FILE,
+        'metrics': docs_dir / METRICS_FILE,
+        'schema': docs_dir / SCHEMA_FILE,
+    }
+
+    if result.tables_changed:
+        write_options = dict(compression=compression, row_group_size=row_group_size)
+        # En modo incremental con partición solo se reescriben las particiones afectadas
+        partitions = None
+        if partition_by and touched_books is not None:
+            partitions = dim_book_table(touched_books)[partition_by]
+        write_table(
+            dim_book_table(result.dim_book), paths['dim_book'],
+            partition_by=partition_by, partitions=partitions, **write_options
+        )
+        write_table(pa.Table.from_pandas(result.source_detail, preserve_index=False), paths['detail'], **write_options)
+    else:
+        print(f"[INFO] Sin cambios en landing: dim_book y detail no se reescriben.")
+
+    with open(paths['metrics'], 'w', encoding='utf-8') as f:
+        json.dump(result.quality_metrics, f, indent=4, ensure_ascii=False)
+
+    with open(paths['schema'], 'w', encoding='utf-8') as f:
+        f.write(SCHEMA_DOC.strip())
+
+    return paths
+
+# =============================================================================
+# API
+# =============================================================================
+INTEGRATION_MODES = ('full', 'incremental')
+
+@dataclass
+class IntegrationResult:
+    """Tablas y métricas de una integración (y rutas, si se escribieron)."""
+    dim_book: pd.DataFrame
+    source_detail: pd.DataFrame
+    quality_metrics: dict
+    ingestion_ts: str
+    tables_changed: bool = True
+    # Solo en modo incremental: claves nuevas o modificadas y filas de
+    # dim_book afectadas (antes y después), que fijan las particiones a reescribir
+    changed_keys: Optional[int] = None
+    touched_books: Optional[pd.DataFrame] = None
+    paths: dict = field(default_factory=dict)
+
+def run(gr_df, gb_df, *, out_dir=None, mode='full', ingestion_ts=None, partition_by=None,
+        compression='zstd', row_group_size=131072, quality=None, previous=None,
+        partial=False) -> IntegrationResult:
+    """
+    Integra los DataFrames crudos de Goodreads y Google Books (con las columnas
+    de landing) en dim_book y el detalle por fuente.
+
+    Sin `out_dir` todo queda en memoria. Con `out_dir` se escriben
+    `<out_dir>/standard` y `<out_dir>/docs`. mode='incremental' necesita
+    `out_dir` y parte de las tablas que ya haya allí. `partition_by`,
+    `compression` y `row_group_size` controlan la escritura Parquet.
+    `quality` (QualityMetrics) sustituye a las métricas de gr_df/gb_df
+    cuando estos son solo una parte de los datos (integración por lotes).
+    `previous` (dim_book, detalle) son las tablas de una integración anterior
+    ya en memoria: en modo incremental se usan en lugar de leer las de
+    `out_dir` (integración por lotes sin releer standard/ en cada lote).
+    `partial` indica que gr_df/gb_df no son todo el landing: en modo
+    incremental no se retiran los registros previos que no aparecen en
+    ellos, solo los que aparecen con otra clave.
+    """
+    if mode not in INTEGRATION_MODES:
+        raise ValueError(f"Modo de integración desconocido: {mode}")
+    if mode == 'incremental' and out_dir is None and previous is None:
+        raise ValueError("El modo incremental necesita out_dir o previous con las tablas previas")
+    if partition_by and partition_by not in DIM_BOOK_SCHEMA.names:
+        raise ValueError(f"La columna de partición no existe en dim_book: {partition_by}")
+    ingestion_ts = ingestion_ts or datetime.utcnow().isoformat()
+
+    with timer('integrate.prepare_sources'):
+        df_gr, df_gb, quality_metrics = prepare_sources(gr_df, gb_df, ingestion_ts, quality)
+    df_source_detail = pd.concat([df_gr, df_gb], ignore_index=True, sort=False)
+
+    tables_changed = True
+    touched_books = None
+    keys = None
+    if mode != 'incremental':
+        previous = None
+    elif previous is None:
+        with timer('integrate.load_previous_tables'):
+            previous = load_previous_tables(Path(out_dir) / 'standard')
+    if previous is None:
+        with timer('integrate.merge_sources'):
+            merged = merge_sources(df_gr, df_gb, ingestion_ts)
+        with timer('integrate.deduplicate_books'):
+            df_dim_book = deduplicate_books(merged)
+        with timer('integrate.assign_book_ids'):
+            df_dim_book['book_id_chosen'] = assign_book_ids(df_dim_book)
+    else:
+        prev_dim, prev_detail = previous
+        with timer('integrate.changed_keys'):
+            keys = changed_keys(df_source_detail, prev_detail)
+            input_ids = {'goodreads': gr_df['book_url'], 'googlebooks': gb_df['gb_id']} if partial else None
+            stale = stale_rows(df_source_detail, prev_detail, input_ids)
+        print(f"[INFO] Modo incremental: {len(keys)} claves nuevas o modificadas, {stale.sum()} registros retirados.")
+        if len(keys) or stale.any():
+            with timer('integrate.upsert_books'):
+                df_dim_book, df_source_detail, touched_books = upsert_books(
+                    df_gr, df_gb, df_source_detail, prev_dim, prev_detail, keys, ingestion_ts, stale
+                )
+        else:
+            tables_changed = False
+            df_dim_book = prev_dim
+            df_source_detail = prev_detail.drop(columns=DETAIL_DERIVED_COLUMNS, errors='ignore')
+
+    with timer('integrate.link_source_detail'):
+        df_source_detail = link_source_detail(df_source_detail, df_dim_book)
+    quality_metrics['duplicados_encontrados'] = len(df_source_detail) - len(df_dim_book)
+
+    result = IntegrationResult(
+        dim_book=df_dim_book,
+        source_detail=df_source_detail,
+        quality_metrics=quality_metrics,
+        ingestion_ts=ingestion_ts,
+        tables_changed=tables_changed,
+        changed_keys=None if keys is None else len(keys),
+        touched_books=touched_books,
+    )
+    if out_dir is not None:
+        with timer('integrate.write_outputs'):
+            result.paths = write_outputs(
+                result, out_dir, touched_books, partition_by=partition_by,
+                compression=compression, row_group_size=row_group_size
+            )
+    return result
+
+# =============================================================================
+# CLI
+# =============================================================================
+def load_landing(goodreads_path=GOODREADS_PATH, googlebooks_path=GOOGLEBOOKS_PATH):
+    """
+    Lee los ficheros de landing tal cual: (df_gr, df_gb). Se leen por lotes
+    de Arrow (sin pasar por una lista de dicts ni por pd.read_csv) con los
+    ISBN y las fechas siempre como texto. En NDJSON (registros añadidos por
+    varias ejecuciones del scraper) se conserva la última versión de cada
+    libro.
+    """
+    if not goodreads_path.exists():
+        raise FileNotFoundError(f"No se encontró: {goodreads_path}")
+    if not googlebooks_path.exists():
+        raise FileNotFoundError(f"No se encontró: {googlebooks_path}")
+
+    print(f"[INFO] Leyendo fuentes en landing/ (solo lectura)...")
+    print(f"   - Goodreads: {goodreads_path}")
+    print(f"   - GoogleBooks: {googlebooks_path}")
+
+    df_gr = to_pandas(read_landing_table(goodreads_path, column_types=GOODREADS_TYPES))
+    if goodreads_path.suffix == '.ndjson':
+        repeated = df_gr['book_url'].notnull() & df_gr.duplicated('book_url', keep='last')
+        df_gr = df_gr[~repeated].reset_index(drop=True)
+    df_gb = to_pandas(read_landing_table(googlebooks_path, column_types=GOOGLEBOOKS_TYPES))
+    return df_gr, df_gb
+
+def write_options_from_env():
+    """Opciones de escritura Parquet de run() según las variables de entorno."""
+    return dict(
+        # Partición hive opcional de dim_book (p. ej. year_pub o language_bcp)
+        partition_by=os.getenv('DIM_BOOK_PARTITION_BY', '').strip() or None,
+        compression=os.getenv('PARQUET_COMPRESSION', 'zstd'),
+        row_group_size=int(os.getenv('PARQUET_ROW_GROUP_SIZE', '131072')),
+    )
+
+def main():
+    load_dotenv()
+    for dir_path in [STANDARD_DIR, DOCS_DIR, WORK_DIR]:
+        dir_path.mkdir(exist_ok=True)
+
+    goodreads_format = os.getenv('GOODREADS_OUTPUT_FORMAT', 'json').strip().lower()
+    # Tiempos por etapa (y perfil, con PIPELINE_PROFILE) en docs/run_report.json
+    with run_report('integrate_pipeline', DOCS_DIR):
+        with timer('integrate.load_landing'):
+            df_gr, df_gb = load_landing(GOODREADS_NDJSON_PATH if goodreads_format == 'ndjson' else GOODREADS_PATH)
+        result = run(
+            df_gr, df_gb, out_dir=BASE_DIR,
+            # full: reconstruye las tablas desde cero; incremental: solo integra los
+            # registros de landing nuevos o modificados sobre las tablas existentes
+            mode=os.getenv('INTEGRATION_MODE', 'full').strip().lower(),
+            **write_options_from_env()
+        )
+
+    print(f"[OK] Integración completada.")
+    print(f"   dim_book: {result.paths['dim_book']}")
+    print(f"   detail: {result.paths['detail']}")
+    print(f"   metrics: {result.paths['metrics']}")
+    print(f"   schema: {result.paths['schema']}")
+
+
+if __name__ == "__main__":
+    main()
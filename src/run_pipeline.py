@@ -0,0 +1,353 @@
+"""
+Pipeline completo en un solo proceso: scraping de Goodreads -> enriquecimiento
+con Google Books -> integración, con las etapas conectadas por colas acotadas.
+
+- Cada libro pasa al enriquecimiento en cuanto el scraper lo completa, y cada
+  par (libro, fila de Google Books) a la integración en cuanto se enriquece:
+  ninguna etapa espera a que la anterior termine.
+- Las colas tienen capacidad limitada (PIPELINE_QUEUE_SIZE): si una etapa va
+  más lenta, las anteriores se bloquean al encolar (contrapresión) y los
+  libros en tránsito entre etapas no crecen con el tamaño del catálogo.
+- La integración se hace por lotes (PIPELINE_BATCH_SIZE libros o cada
+  PIPELINE_BATCH_SECONDS) en modo incremental sobre dim_book y el detalle en
+  memoria (se leen de standard/ una sola vez). standard/ se reescribe cada
+  PIPELINE_FLUSH_SECONDS y al terminar. La integración sí mantiene en
+  memoria esas tablas y los registros de la ejecución (RunRecords).
+- landing/ se sigue escribiendo: goodreads_books.ndjson (+ .meta.json) y
+  googlebooks_books.csv, así que los scripts por separado siguen funcionando
+  sobre la salida del pipeline. El NDJSON se amplía en cada ejecución; en el
+  CSV, las filas de las claves integradas en la ejecución sustituyen a las
+  anteriores (como en el detalle), así que una integración completa del
+  landing da las mismas tablas que el pipeline.
+
+Uso:
+    python src/run_pipeline.py
+"""
+
+import csv
+import itertools
+import os
+import queue
+import threading
+import time
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from dotenv import load_dotenv
+
+# Antes de importar las etapas: leen su configuración al importarse
+load_dotenv()
+
+import enrich_googlebooks
+import integrate_pipeline
+import scrape_goodreads
+from utils_landing import (
+    GOODREADS_TYPES, GOOGLEBOOKS_TYPES, NdjsonWriter, append_run_metadata, records_to_batch, to_pandas
+)
+from utils_profiling import incr, observe, run_report, timer
+from utils_quality import QualityMetrics
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+QUEUE_SIZE = max(1, int(os.getenv('PIPELINE_QUEUE_SIZE', '200')))
+BATCH_SIZE = max(1, int(os.getenv('PIPELINE_BATCH_SIZE', '500')))
+BATCH_SECONDS = float(os.getenv('PIPELINE_BATCH_SECONDS', '30'))
+# Espera máxima para completar un lote de ISBN antes de llamar a Google Books
+LINGER_SECONDS = float(os.getenv('PIPELINE_LINGER_SECONDS', '1'))
+# Cada cuánto se escriben en standard/ las tablas integradas en memoria
+FLUSH_SECONDS = float(os.getenv('PIPELINE_FLUSH_SECONDS', '60'))
+
+ENRICH_WORKERS = enrich_googlebooks.CONCURRENCY
+GOODREADS_OUT = integrate_pipeline.GOODREADS_NDJSON_PATH
+GOOGLEBOOKS_OUT = integrate_pipeline.GOOGLEBOOKS_PATH
+
+
+# =============================================================================
+# COLAS
+# =============================================================================
+def take_batch(q, max_items, max_wait):
+    """
+    Espera al primer elemento de `q` y junta hasta `max_items` en como mucho
+    `max_wait` segundos. Devuelve (elementos, terminado); terminado indica
+    que ha llegado el centinela None.
+    """
+    first = q.get()
+    if first is None:
+        return [], True
+    items = [first]
+    deadline = time.monotonic() + max_wait
+    while len(items) < max_items:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            item = q.get(timeout=timeout)
+        except queue.Empty:
+            break
+        if item is None:
+            return items, True
+        items.append(item)
+    return items, False
+
+
+def record_key(record):
+    # Misma clave que `_key` en la integración (solo se integran registros con título e ISBN-13)
+    if record is None or record.get('title') in (None, '') or record.get('isbn13') in (None, ''):
+        return None
+    return str(record['isbn13'])
+
+
+class RunRecords:
+    """
+    Libros de esta ejecución agrupados por clave de integración. El modo
+    incremental toma los registros que recibe de una clave como su versión
+    completa, así que cada lote se completa con los de lotes anteriores que
+    comparten clave (p. ej. ediciones distintas con el mismo ISBN). Guarda
+    todos los libros de la ejecución: un lote posterior puede traer
+    cualquier clave.
+    """
+
+    def __init__(self):
+        self.by_key = {}
+        self.arrivals = itertools.count()
+
+    def complete(self, items):
+        """Elementos del lote más los anteriores con las mismas claves, por orden de llegada."""
+        batch = {}
+        for item in items:
+            arrival = next(self.arrivals)
+            batch[arrival] = item
+            _, book, row, _ = item
+            for key in {record_key(book), record_key(row)} - {None}:
+                group = self.by_key.setdefault(key, [])
+                batch.update(group)
+                group.append((arrival, item))
+        return [batch[arrival] for arrival in sorted(batch)]
+
+
+# =============================================================================
+# ETAPAS
+# =============================================================================
+def enrich_worker(books_q, rows_q):
+    """Enriquece los libros de `books_q` en lotes de ISBN y los pasa a `rows_q`."""
+    while True:
+        items, finished = take_batch(books_q, enrich_googlebooks.ISBN_BATCH_SIZE, LINGER_SECONDS)
+        if items:
+            books = [book for _, book, _ in items]
+            try:
+                rows = enrich_googlebooks.enrich_batch(books)
+            except Exception as e:
+                # El libro se integra igualmente, sin datos de Google Books
+                print(f"[ERROR] Enriquecimiento de {len(books)} libros: {e}")
+                rows = [None] * len(books)
+            for (seq, book, t0), row in zip(items, rows):
+                rows_q.put((seq, book, row, t0))
+        if finished:
+            return
+
+
+def close_when_done(threads, q):
+    for t in threads:
+        t.join()
+    q.put(None)
+
+
+def landing_row(row):
+    # Igual que al leer el CSV: las celdas vacías son nulos
+    return {k: (None if row.get(k) == '' else row.get(k)) for k in enrich_googlebooks.FIELDNAMES}
+
+
+def landing_frame(records, column_types):
+    # Mismos tipos y orden de columnas que al leer landing/ (primero las
+    # conocidas), para que los hash de contenido y las métricas coincidan
+    table = pa.Table.from_batches([records_to_batch(records, column_types)])
+    known = [name for name in column_types if name in table.column_names]
+    return to_pandas(table.select(known + [name for name in table.column_names if name not in column_types]))
+
+
+def landing_frames(items):
+    # Mismo orden que en landing: Goodreads por orden de extracción (NDJSON)
+    # y Google Books por orden de llegada (CSV)
+    gr_df = landing_frame([book for _, book, _, _ in sorted(items, key=lambda item: item[0])], GOODREADS_TYPES)
+    gb_rows = [landing_row(row) for _, _, row, _ in items if row is not None]
+    gb_df = landing_frame(gb_rows, GOOGLEBOOKS_TYPES) if gb_rows else pd.DataFrame(columns=enrich_googlebooks.FIELDNAMES)
+    return gr_df, gb_df
+
+
+class StandardTables:
+    """
+    dim_book y detalle de la ejecución en memoria entre lotes. Cada lote se
+    integra sobre ellos sin releer standard/, que se reescribe en `flush`
+    (con partición, solo las particiones afectadas desde la última escritura).
+    """
+
+    def __init__(self, write_options):
+        self.write_options = write_options
+        with timer('pipeline.load_previous_tables'):
+            self.previous = integrate_pipeline.load_previous_tables(integrate_pipeline.STANDARD_DIR)
+        self.result = None
+        # Filas de dim_book afectadas desde la última escritura (None: todas)
+        self.touched = []
+        self.pending = False
+        self.last_flush = time.monotonic()
+
+    def integrate(self, gr_df, gb_df, quality):
+        result = integrate_pipeline.run(
+            gr_df, gb_df, mode='full' if self.previous is None else 'incremental',
+            previous=self.previous, quality=quality, partial=True, **self.write_options
+        )
+        self.previous = (result.dim_book, result.source_detail)
+        self.result = result
+        if result.tables_changed:
+            self.pending = True
+            if result.touched_books is None:
+                self.touched = None
+            elif self.touched is not None:
+                self.touched.append(result.touched_books)
+        return result
+
+    def flush(self, force=False):
+        """Escribe las tablas en standard/ si hay cambios y toca (o si `force`)."""
+        if not self.pending or (not force and time.monotonic() - self.last_flush < FLUSH_SECONDS):
+            return
+        touched = None if self.touched is None else pd.concat(self.touched, ignore_index=True)
+        with timer('pipeline.flush_standard'):
+            integrate_pipeline.write_outputs(
+                replace(self.result, tables_changed=True), integrate_pipeline.BASE_DIR, touched,
+                **self.write_options
+            )
+        self.touched = []
+        self.pending = False
+        self.last_flush = time.monotonic()
+
+
+def integrate_batches(rows_q, gb_writer, run_records):
+    """
+    Escribe en el CSV de Google Books e integra por lotes los libros de
+    `rows_q`; devuelve la latencia de cada libro hasta su integración.
+    """
+    tables = StandardTables(integrate_pipeline.write_options_from_env())
+    # Métricas de calidad de todos los libros de la ejecución (no solo del último lote)
+    quality = QualityMetrics()
+    latencies = []
+    while True:
+        items, finished = take_batch(rows_q, BATCH_SIZE, BATCH_SECONDS)
+        if items:
+            gb_writer.writerows(row for _, _, row, _ in items if row is not None)
+            quality.add(*(integrate_pipeline.ensure_types(df) for df in landing_frames(items)))
+            gr_df, gb_df = landing_frames(run_records.complete(items))
+            with timer('pipeline.integrate_batch'):
+                result = tables.integrate(gr_df, gb_df, quality)
+            done = time.monotonic()
+            incr('pipeline.books_integrated', len(items))
+            for _, _, _, t0 in items:
+                latencies.append(done - t0)
+                observe('pipeline.book_latency', done - t0)
+            print(f"[INFO] Lote integrado: {len(items)} libros (dim_book: {len(result.dim_book)} filas).")
+        tables.flush(force=finished)
+        if finished:
+            return latencies
+
+
+def upsert_googlebooks_csv(run_path, run_keys):
+    """
+    Pasa al CSV de Google Books las filas de esta ejecución (`run_path`): las
+    anteriores de las claves integradas ahora (`run_keys`) se descartan, como
+    en el detalle del modo incremental, y las demás se mantienen.
+    """
+    # Las filas sin clave no se integran: no hace falta conservarlas
+    replaced = set(run_keys) | {None}
+    tmp_path = GOOGLEBOOKS_OUT.with_name(GOOGLEBOOKS_OUT.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+        writer = csv.DictWriter(out, fieldnames=enrich_googlebooks.FIELDNAMES, extrasaction='ignore')
+        writer.writeheader()
+        if GOOGLEBOOKS_OUT.exists():
+            with open(GOOGLEBOOKS_OUT, encoding='utf-8', newline='') as f:
+                writer.writerows(row for row in csv.DictReader(f) if record_key(landing_row(row)) not in replaced)
+        with open(run_path, encoding='utf-8', newline='') as f:
+            writer.writerows(csv.DictReader(f))
+    os.replace(tmp_path, GOOGLEBOOKS_OUT)
+    run_path.unlink()
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+def main():
+    queries = scrape_goodreads.load_queries()
+    for dir_path in [integrate_pipeline.STANDARD_DIR, integrate_pipeline.DOCS_DIR, integrate_pipeline.WORK_DIR]:
+        dir_path.mkdir(exist_ok=True)
+
+    books_q = queue.Queue(maxsize=QUEUE_SIZE)
+    rows_q = queue.Queue(maxsize=QUEUE_SIZE)
+    scraped = {}
+    sequence = itertools.count()
+    emit_lock = threading.Lock()
+    start = time.monotonic()
+
+    # Las filas de Google Books de la ejecución se escriben aparte y al
+    # terminar se pasan al CSV del landing (upsert_googlebooks_csv)
+    gb_run_path = GOOGLEBOOKS_OUT.with_name(GOOGLEBOOKS_OUT.name + '.run')
+    run_records = RunRecords()
+    with NdjsonWriter(GOODREADS_OUT) as gr_writer, \
+         open(gb_run_path, 'w', encoding='utf-8', newline='') as gb_file:
+        gb_writer = csv.DictWriter(gb_file, fieldnames=enrich_googlebooks.FIELDNAMES)
+        gb_writer.writeheader()
+
+        def emit(book):
+            # Número de orden igual al orden de escritura en el NDJSON
+            with emit_lock:
+                seq = next(sequence)
+                gr_writer.write(book)
+            books_q.put((seq, book, time.monotonic()))
+
+        def update(book):
+            # Búsquedas que encontraron el libro después de emitirlo: solo
+            # cambia `queries`, así que no se vuelve a enriquecer ni integrar
+            with emit_lock:
+                gr_writer.write(book)
+
+        def scrape_stage():
+            try:
+                scraped['books'], scraped['metadata'] = scrape_goodreads.scrape(queries, emit=emit, update=update)
+            finally:
+                # Un centinela por worker de enriquecimiento
+                for _ in range(ENRICH_WORKERS):
+                    books_q.put(None)
+
+        # Hilos daemon: si la integración falla, el proceso no se queda colgado
+        # con productores bloqueados en colas llenas
+        scraper = threading.Thread(target=scrape_stage, daemon=True)
+        enrichers = [
+            threading.Thread(target=enrich_worker, args=(books_q, rows_q), daemon=True)
+            for _ in range(ENRICH_WORKERS)
+        ]
+        closer = threading.Thread(target=close_when_done, args=(enrichers, rows_q), daemon=True)
+        for t in [scraper, *enrichers, closer]:
+            t.start()
+
+        latencies = integrate_batches(rows_q, gb_writer, run_records)
+        scraper.join()
+
+    upsert_googlebooks_csv(gb_run_path, run_records.by_key.keys())
+
+    if 'metadata' not in scraped:
+        raise SystemExit("[ERROR] El scraping no terminó correctamente.")
+    append_run_metadata(GOODREADS_OUT, scraped['metadata'])
+    enrich_googlebooks.record_memo_stats()
+
+    elapsed = time.monotonic() - start
+    print(f"[OK] Pipeline completado en {elapsed:.1f}s: {len(latencies)} libros integrados.")
+    if latencies:
+        p50, p95 = np.percentile(latencies, [50, 95])
+        print(f"[INFO] Latencia por libro (scraping -> integración): p50 {p50:.1f}s, p95 {p95:.1f}s.")
+    print(f"   landing: {GOODREADS_OUT}, {GOOGLEBOOKS_OUT}")
+    print(f"   standard: {integrate_pipeline.STANDARD_DIR}")
+
+
+if __name__ == "__main__":
+    with run_report("run_pipeline", integrate_pipeline.DOCS_DIR):
+        main()
@@ -2,6 +2,11 @@ import os
 import time
 import json
 import re
+import html
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 from urllib.parse import urljoin, quote_plus
@@ -11,15 +16,36 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from utils_http import TokenBucket, build_session
+from utils_cache import ScrapeStateStore
+from utils_landing import NdjsonWriter, append_run_metadata
+from utils_profiling import incr, run_report, timer
 
 # ================================
 # CARGAR VARIABLES DE ENTORNO
 # ================================
 load_dotenv()
 SEARCH_QUERY = os.getenv('SEARCH_QUERY', 'data science')
+# Varias búsquedas: SEARCH_QUERIES="a|b|c" o un fichero con una por línea
+SEARCH_QUERIES_FILE = os.getenv('SEARCH_QUERIES_FILE', '')
+# Máximo de libros por búsqueda
 MAX_BOOKS = int(os.getenv('MAX_BOOKS', '15'))
 RATE_LIMIT = float(os.getenv('RATE_LIMIT_SECONDS', '0.8'))
 USER_AGENT = os.getenv('USER_AGENT', 'books-pipeline-bot/1.0 (+https://example.com)')
+# Base de las URLs (se puede apuntar a fixtures HTML servidos en local)
+GOODREADS_BASE_URL = os.getenv('GOODREADS_BASE_URL', 'https://www.goodreads.com').rstrip('/')
+SCRAPE_WORKERS = max(1, int(os.getenv('SCRAPE_WORKERS', '4')))
+DRIVER_MAX_PAGES = int(os.getenv('DRIVER_MAX_PAGES', '50'))
+SEARCH_WORKERS_MAX = max(1, int(os.getenv('SEARCH_WORKERS', '2')))
+# Leer el detalle por HTTP antes de recurrir a Selenium (SCRAPE_FAST_PATH=0 lo desactiva)
+FAST_PATH_ENABLED = os.getenv('SCRAPE_FAST_PATH', '1') == '1'
+# Libros extraídos hace menos de estas horas se reutilizan del estado guardado
+MAX_AGE_HOURS = float(os.getenv('SCRAPE_MAX_AGE_HOURS', '168'))
+# json: un documento al final de la ejecución; ndjson: un registro por línea
+# a medida que se extrae (se añade a lo de ejecuciones anteriores)
+OUTPUT_FORMAT = os.getenv('GOODREADS_OUTPUT_FORMAT', 'json').strip().lower()
+if OUTPUT_FORMAT not in ('json', 'ndjson'):
+    raise SystemExit(f"[ERROR] GOODREADS_OUTPUT_FORMAT no válido: {OUTPUT_FORMAT} (json | ndjson)")
 
 # ===========================================
 # DIRECTORIOS DEL PROYECTO
@@ -27,7 +53,9 @@ USER_AGENT = os.getenv('USER_AGENT', 'books-pipeline-bot/1.0 (+https://example.c
 BASE_DIR = Path(__file__).resolve().parent.parent
 landing = BASE_DIR / 'landing'
 landing.mkdir(exist_ok=True)
-OUTPUT_FILE = landing / 'goodreads_books.json'
+DOCS_DIR = BASE_DIR / 'docs'
+OUTPUT_FILE = landing / f'goodreads_books.{OUTPUT_FORMAT}'
+STATE_PATH = Path(os.getenv('SCRAPE_STATE_PATH', str(BASE_DIR / 'staging' / 'goodreads_state.sqlite')))
 
 # ===============================
 # CONFIGURACIÓN DE SELENIUM
@@ -37,7 +65,50 @@ chrome_options.add_argument(f"user-agent={USER_AGENT}")
 chrome_options.add_argument("--headless=new")
 chrome_options.add_argument("--disable-gpu")
 chrome_options.add_argument("--no-sandbox")
-driver = webdriver.Chrome(options=chrome_options)
+
+def create_driver():
+    return webdriver.Chrome(options=chrome_options)
+
+# Sesión HTTP compartida por los workers para la vía rápida
+HTTP_SESSION = build_session({'User-Agent': USER_AGENT}, pool_maxsize=SCRAPE_WORKERS)
+
+# Cuántos detalles se resolvieron por cada vía (http / selenium)
+FETCH_PATHS = Counter()
+_fetch_paths_lock = threading.Lock()
+
+# Límite de cortesía global: entre todos los workers, como mucho una carga de
+# página cada RATE_LIMIT segundos
+POLITENESS = TokenBucket(1 / RATE_LIMIT if RATE_LIMIT > 0 else 0, capacity=1)
+
+
+class RecyclingDriver:
+    """
+    Chrome headless que se reinicia cada `max_pages` páginas para que la
+    memoria del navegador no crezca sin límite. Cada worker usa el suyo.
+    """
+
+    def __init__(self, max_pages=DRIVER_MAX_PAGES):
+        self.max_pages = max_pages
+        self.pages = 0
+        self.driver = None
+
+    def get(self, url):
+        if self.driver is None or (self.max_pages and self.pages >= self.max_pages):
+            self.quit()
+            self.driver = create_driver()
+            self.pages = 0
+        POLITENESS.acquire()
+        self.driver.get(url)
+        self.pages += 1
+        return self.driver
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
 
 # ===============================
 # PARSE DE RATING
@@ -55,87 +126,354 @@ def parse_rating_and_count(minirating_text):
 # =====================================
 # EXTRACCIÓN PRECISA DEL ISBN
 # =====================================
-def extract_isbn_from_page():
+# Nombre en las métricas (scrape.isbn13_source.*) de cada vía de extracción
+ISBN_SOURCE_METRIC = {"div texto principal": "div", "pattern_global": "pattern_global", None: "none"}
+
+def extract_isbn_from_page(driver):
     """
-    Extrae ISBN-13 e ISBN-10 de la página de Goodreads.
+    Extrae ISBN-13 e ISBN-10 de la página de Goodreads cargada en `driver`.
     Primero intenta desde los divs específicos, luego usa pattern global si falla.
     """
     isbn10, isbn13 = None, None
     source10, source13 = None, None
 
     # Intentar abrir el detalle si hay botón
-    try:
-        btn = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "button[aria-label*='Book details']"))
-        )
-        driver.execute_script("arguments[0].click();", btn)
-        time.sleep(1.5)
-    except Exception as e:
-        print("No se pudo activar el botón:", e)
+    with timer('scrape.extract_isbn.details_button'):
+        try:
+            btn = WebDriverWait(driver, 5).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, "button[aria-label*='Book details']"))
+            )
+            driver.execute_script("arguments[0].click();", btn)
+            # Esperar a que el detalle despliegue el ISBN (sale en cuanto aparece)
+            WebDriverWait(driver, 3).until(lambda d: 'ISBN' in d.page_source)
+        except Exception as e:
+            print("No se pudo activar el botón:", e)
 
     # Esperar que carguen los divs
-    try:
-        WebDriverWait(driver, 5).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.TruncatedContent__text"))
-        )
-    except Exception as e:
-        print("No se cargaron los divs de ISBN:", e)
+    with timer('scrape.extract_isbn.wait_divs'):
+        try:
+            WebDriverWait(driver, 5).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.TruncatedContent__text"))
+            )
+        except Exception as e:
+            print("No se cargaron los divs de ISBN:", e)
 
     # Buscar los divs que contienen los ISBN
-    try:
-        divs = driver.find_elements(By.CSS_SELECTOR, "div.TruncatedContent__text")
-        for div in divs:
-            # ISBN-13: primer número de 13 dígitos en el texto principal
-            full_text = div.text
-            match_13 = re.search(r'\b\d{13}\b', full_text)
-            if match_13:
-                isbn13 = match_13.group()
-                source13 = "div texto principal"
+    with timer('scrape.extract_isbn.divs'):
+        try:
+            divs = driver.find_elements(By.CSS_SELECTOR, "div.TruncatedContent__text")
+            for div in divs:
+                # ISBN-13: primer número de 13 dígitos en el texto principal
+                full_text = div.text
+                match_13 = re.search(r'\b\d{13}\b', full_text)
+                if match_13:
+                    isbn13 = match_13.group()
+                    source13 = "div texto principal"
+
+                # ISBN-10: dentro del span
+                try:
+                    span = div.find_element(By.TAG_NAME, "span")
+                    match_10 = re.search(r'ISBN10:\s*([\dXx]{10})', span.text)
+                    if match_10:
+                        isbn10 = match_10.group(1)
+                        source10 = "span"
+                except:
+                    pass
+
+                # Si ambos encontrados, salir
+                if isbn10 and isbn13:
+                    break
+
+        except Exception as e:
+            print("Error extrayendo ISBN desde div:", e)
 
-            # ISBN-10: dentro del span
-            try:
-                span = div.find_element(By.TAG_NAME, "span")
-                match_10 = re.search(r'ISBN10:\s*([\dXx]{10})', span.text)
-                if match_10:
-                    isbn10 = match_10.group(1)
-                    source10 = "span"
-            except:
-                pass
+    # Pattern global solo si no se encontró en los divs
+    with timer('scrape.extract_isbn.pattern_global'):
+        src = driver.page_source
+        if not isbn13:
+            m13 = re.search(r'ISBN(?:-13)?:?\s*([0-9\-]{13,17})', src, re.IGNORECASE)
+            if m13:
+                isbn13 = m13.group(1).replace("-", "").strip()
+                source13 = "pattern_global"
+        if not isbn10:
+            m10 = re.search(r'ISBN(?:-10)?:?\s*([0-9Xx\-]{10,17})', src, re.IGNORECASE)
+            if m10:
+                isbn10 = m10.group(1).replace("-", "").strip()
+                source10 = "pattern_global"
+
+    # Por qué vía se resolvió el ISBN-13 (div, pattern_global o ninguna)
+    source_metric = ISBN_SOURCE_METRIC[source13]
+    incr(f"scrape.isbn13_source.{source_metric}")
+    return isbn10, isbn13
 
-            # Si ambos encontrados, salir
-            if isbn10 and isbn13:
-                break
 
-    except Exception as e:
-        print("Error extrayendo ISBN desde div:", e)
+# =====================================
+# VÍA RÁPIDA: DETALLE POR HTTP
+# =====================================
+JSON_LD_RE = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.S | re.I)
+TITLE_RE = re.compile(r'<h1[^>]*data-testid=["\']bookTitle["\'][^>]*>(.*?)</h1>', re.S)
+TRUNCATED_RE = re.compile(r'<div[^>]*class=["\'][^"\']*TruncatedContent__text[^"\']*["\'][^>]*>(.*?)</div>', re.S)
+TAG_RE = re.compile(r'<[^>]+>')
 
-    # Pattern global solo si no se encontró en los divs
-    src = driver.page_source
+
+def html_text(fragment):
+    return ' '.join(html.unescape(TAG_RE.sub(' ', fragment)).split())
+
+
+def parse_book_html(src):
+    """
+    Extrae título, ISBN-10 e ISBN-13 del HTML de una página de libro sin
+    navegador: JSON-LD, el estado JSON embebido y, si el HTML trae el
+    detalle ya renderizado, los mismos divs que usa extract_isbn_from_page.
+    """
+    title, isbn10, isbn13 = None, None, None
+
+    # JSON-LD (schema.org/Book)
+    for block in JSON_LD_RE.findall(src):
+        try:
+            data = json.loads(html.unescape(block))
+        except ValueError:
+            continue
+        for entry in data if isinstance(data, list) else [data]:
+            if not isinstance(entry, dict):
+                continue
+            title = title or entry.get('name')
+            isbn = re.sub(r'[^0-9Xx]', '', str(entry.get('isbn') or ''))
+            if len(isbn) == 13:
+                isbn13 = isbn13 or isbn
+            elif len(isbn) == 10:
+                isbn10 = isbn10 or isbn
+
+    # Estado JSON embebido en la página
     if not isbn13:
-        m13 = re.search(r'ISBN(?:-13)?:?\s*([0-9\-]{13,17})', src, re.IGNORECASE)
+        m13 = re.search(r'"isbn13"\s*:\s*"(\d{13})"', src)
         if m13:
-            isbn13 = m13.group(1).replace("-", "").strip()
-            source13 = "pattern_global"
+            isbn13 = m13.group(1)
     if not isbn10:
-        m10 = re.search(r'ISBN(?:-10)?:?\s*([0-9Xx\-]{10,17})', src, re.IGNORECASE)
+        m10 = re.search(r'"isbn"\s*:\s*"([\dXx]{10})"', src)
         if m10:
-            isbn10 = m10.group(1).replace("-", "").strip()
-            source10 = "pattern_global"
+            isbn10 = m10.group(1)
 
-    return isbn10, isbn13
+    # Detalle renderizado: mismos patrones que en Selenium
+    for fragment in TRUNCATED_RE.findall(src):
+        text = html_text(fragment)
+        if not isbn13:
+            match_13 = re.search(r'\b\d{13}\b', text)
+            if match_13:
+                isbn13 = match_13.group()
+        if not isbn10:
+            match_10 = re.search(r'ISBN10:\s*([\dXx]{10})', text)
+            if match_10:
+                isbn10 = match_10.group(1)
+        if isbn10 and isbn13:
+            break
+
+    m = TITLE_RE.search(src)
+    if m and html_text(m.group(1)):
+        title = html_text(m.group(1))
+
+    return title, isbn10, isbn13
+
+
+def fetch_book_http(book_url):
+    """
+    Descarga la página del libro sin navegador. Devuelve (título, isbn10,
+    isbn13) o None si la petición falla.
+    """
+    with timer('scrape.politeness_wait'):
+        POLITENESS.acquire()
+    try:
+        with timer('scrape.fetch_http'):
+            r = HTTP_SESSION.get(book_url, timeout=15)
+        incr('scrape.http_bytes', len(r.content))
+        r.raise_for_status()
+    except Exception as e:
+        incr('scrape.http_errors')
+        print(f"Vía HTTP falló para {book_url}:", e)
+        return None
+    return parse_book_html(r.text)
+
+
+def record_fetch_path(path):
+    with _fetch_paths_lock:
+        FETCH_PATHS[path] += 1
+    incr(f'scrape.detail_path.{path}')
 
 
 # ================================
-# MAIN SCRAPER
+# DETALLE DE CADA LIBRO
 # ================================
-def main():
-    books = []
-    page = 1
-    pbar = tqdm(total=MAX_BOOKS, desc="Libros extraídos", unit="libro", miniters=1)
+def scrape_book_detail(browser, book):
+    """
+    Completa título, ISBN-10/13 y metadatos de scraping en `book`. Prueba
+    primero la vía HTTP y solo abre la página con `browser` (RecyclingDriver)
+    si por HTTP no aparece ningún ISBN.
+    """
+    parsed = fetch_book_http(book["book_url"]) if FAST_PATH_ENABLED else None
+    if parsed and (parsed[1] or parsed[2]):
+        title, isbn10, isbn13 = parsed
+        if title:
+            book["title"] = title
+        record_fetch_path("http")
+    else:
+        with timer('scrape.selenium_load'):
+            driver = browser.get(book["book_url"])
+
+        try:
+            title_el = WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, 'h1[data-testid="bookTitle"]')
+                )
+            )
+            title = title_el.text.strip()
+            if title:
+                book["title"] = title
+        except:
+            pass
+
+        with timer('scrape.extract_isbn'):
+            isbn10, isbn13 = extract_isbn_from_page(driver)
+        record_fetch_path("selenium")
+
+    book.update({
+        "isbn10": isbn10,
+        "isbn13": isbn13,
+        "scrape_source": "goodreads",
+        "scrape_date": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    })
+    return book
+
+
+# Campos que aporta la página de detalle (el resto viene de la búsqueda)
+DETAIL_FIELDS = ("title", "isbn10", "isbn13", "scrape_source", "scrape_date")
+
+
+def has_isbn(book):
+    # Solo se guardan (y reutilizan) en el estado los detalles con algún ISBN:
+    # sin ISBN puede ser un fallo de carga y se vuelve a intentar
+    return bool(book.get("isbn10") or book.get("isbn13"))
+
+
+def detail_worker(tasks, pbar, state, emit):
+    """
+    Toma libros de la cola compartida hasta recibir None, extrae su detalle
+    con un navegador propio, lo guarda en el estado persistente (si tiene
+    ISBN) y lo pasa a `emit` (salida NDJSON).
+    """
+    browser = RecyclingDriver()
+    try:
+        while True:
+            book = tasks.get()
+            if book is None:
+                return
+            try:
+                scrape_book_detail(browser, book)
+                if has_isbn(book):
+                    state.upsert(book)
+                else:
+                    incr('scrape.detail_without_isbn')
+            except Exception as e:
+                print(f"Error extrayendo detalle de {book['book_url']}:", e)
+            emit(book)
+            pbar.update(1)
+    finally:
+        browser.quit()
+
+
+# ================================
+# BÚSQUEDA
+# ================================
+def load_queries():
+    """Lista de búsquedas sin repetir: fichero, SEARCH_QUERIES o SEARCH_QUERY."""
+    if SEARCH_QUERIES_FILE:
+        with open(SEARCH_QUERIES_FILE, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f]
+    elif os.getenv('SEARCH_QUERIES'):
+        queries = [q.strip() for q in os.getenv('SEARCH_QUERIES').split('|')]
+    else:
+        queries = [SEARCH_QUERY]
+    return list(dict.fromkeys(q for q in queries if q))
+
+
+class Frontier:
+    """
+    Frontera deduplicada de páginas de detalle compartida por todas las
+    búsquedas: cada `book_url` se encola una sola vez y se anota en
+    `queries` qué búsquedas lo encontraron. Los libros se emiten como copias
+    (`snapshot`), porque las búsquedas siguen ampliando `queries`.
+    """
+
+    def __init__(self):
+        self._books = {}
+        # book_url -> número de búsquedas que lo habían encontrado al emitirlo
+        self._emitted = {}
+        self._lock = threading.Lock()
+
+    def add(self, book, query):
+        """Registra `book` para `query`; devuelve el libro si es nuevo, si no None."""
+        with self._lock:
+            known = self._books.get(book["book_url"])
+            if known is not None:
+                if query not in known["queries"]:
+                    known["queries"].append(query)
+                return None
+            book["queries"] = [query]
+            self._books[book["book_url"]] = book
+            return book
+
+    def books(self):
+        with self._lock:
+            return list(self._books.values())
+
+    def snapshot(self, book):
+        """Copia de `book` para emitirla (y anota que se ha emitido)."""
+        with self._lock:
+            self._emitted[book["book_url"]] = len(book["queries"])
+            return dict(book, queries=list(book["queries"]))
+
+    def updated_since_emitted(self):
+        """Copias de los libros emitidos que otras búsquedas encontraron después."""
+        with self._lock:
+            return [
+                dict(book, queries=list(book["queries"]))
+                for url, book in self._books.items()
+                if url in self._emitted and len(book["queries"]) > self._emitted[url]
+            ]
+
+
+def search_worker(queries, frontier, schedule):
+    """
+    Pagina búsquedas tomadas de la cola `queries` con un navegador propio y
+    pasa a `schedule` cada libro que la frontera ve por primera vez.
+    """
+    browser = RecyclingDriver()
+    try:
+        while True:
+            try:
+                query = queries.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                for book in iter_search_results(browser, query, MAX_BOOKS):
+                    book = frontier.add(book, query)
+                    if book is not None:
+                        schedule(book)
+            except Exception as e:
+                print(f"Error en la búsqueda '{query}':", e)
+    finally:
+        browser.quit()
 
-    while len(books) < MAX_BOOKS:
-        search_url = f"https://www.goodreads.com/search?q={quote_plus(SEARCH_QUERY)}&page={page}"
-        driver.get(search_url)
+
+def iter_search_results(browser, query, max_books):
+    """
+    Recorre las páginas de búsqueda de `query` y va devolviendo los libros
+    encontrados (título, autor, rating y URL), hasta `max_books`.
+    """
+    found = 0
+    page = 1
+    while found < max_books:
+        search_url = f"{GOODREADS_BASE_URL}/search?q={quote_plus(query)}&page={page}"
+        driver = browser.get(search_url)
 
         try:
             WebDriverWait(driver, 12).until(
@@ -143,72 +481,100 @@ def main():
             )
         except:
             print("No se cargaron resultados.")
-            break
+            return
 
-        # ============================
-        # BUSCAR ENLACES DE LIBROS
-        # ============================
         book_links = driver.find_elements(By.CSS_SELECTOR, "a.bookTitle")
         author_links = driver.find_elements(By.CSS_SELECTOR, "a.authorName")
         ratings = driver.find_elements(By.CSS_SELECTOR, "span.minirating")
 
-        for i in range(min(len(book_links), len(author_links), len(ratings))):
+        n = min(len(book_links), len(author_links), len(ratings))
+        if n == 0:
+            return
+        for i in range(n):
             book_url = urljoin(
-                "https://www.goodreads.com",
+                GOODREADS_BASE_URL,
                 book_links[i].get_attribute("href").split("?")[0]
             )
-            books.append({
+            rating, ratings_count = parse_rating_and_count(ratings[i].text)
+            yield {
                 "title": book_links[i].text.strip(),
                 "author": author_links[i].text.strip(),
-                "rating": parse_rating_and_count(ratings[i].text)[0],
-                "ratings_count": parse_rating_and_count(ratings[i].text)[1],
+                "rating": rating,
+                "ratings_count": ratings_count,
                 "book_url": book_url
-            })
-
-            if len(books) >= MAX_BOOKS:
-                break
-
-        # ============================
-        # EXTRAER DETALLE DE CADA LIBRO
-        # ============================
-        for book in books:
-            if "isbn10" in book:
-                continue  # ya procesado
-            driver.get(book["book_url"])
-            time.sleep(RATE_LIMIT)
-
-            try:
-                title_el = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located(
-                        (By.CSS_SELECTOR, 'h1[data-testid="bookTitle"]')
-                    )
-                )
-                title = title_el.text.strip()
-                if title:
-                    book["title"] = title
-            except:
-                pass
-
-            isbn10, isbn13 = extract_isbn_from_page()
-            book.update({
-                "isbn10": isbn10,
-                "isbn13": isbn13,
-                "scrape_source": "goodreads",
-                "scrape_date": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
-            })
+            }
+            found += 1
+            if found >= max_books:
+                return
+        page += 1
 
-            time.sleep(RATE_LIMIT)
 
-        page += 1
-        pbar.update(len(books))
+# ================================
+# MAIN SCRAPER
+# ================================
+def scrape(queries, emit=None, update=None):
+    """
+    Pagina las búsquedas `queries` y extrae el detalle de cada libro con los
+    pools de workers. `emit(book)` se llama desde los workers con una copia
+    de cada libro en cuanto está completo; si bloquea (p. ej. una cola
+    llena), los workers esperan. Al terminar, `update(book)` recibe una copia
+    de los libros que otras búsquedas encontraron después de emitirlos, con
+    `queries` completo (en NDJSON, un registro de actualización: al leerlo
+    se conserva la última versión de cada libro). Devuelve (libros,
+    metadatos de la ejecución).
+    """
+    emit = emit or (lambda book: None)
+    update = update or (lambda book: None)
+    search_workers = min(len(queries), SEARCH_WORKERS_MAX)
+    frontier = Frontier()
+
+    def emit_book(book):
+        emit(frontier.snapshot(book))
+
+    state = ScrapeStateStore(STATE_PATH)
+    reused = Counter()
+    reused_lock = threading.Lock()
+    pbar = tqdm(total=MAX_BOOKS * len(queries), desc="Libros extraídos", unit="libro", miniters=1)
+
+    # Las búsquedas se paginan en paralelo y alimentan una única cola de
+    # detalle; los libros extraídos recientemente se toman del estado guardado
+    tasks = queue.Queue()
+
+    def schedule(book):
+        stored = state.get_fresh(book["book_url"], MAX_AGE_HOURS * 3600)
+        if stored is not None and has_isbn(stored):
+            book.update({k: stored.get(k) for k in DETAIL_FIELDS})
+            with reused_lock:
+                reused["books"] += 1
+            emit_book(book)
+            pbar.update(1)
+        else:
+            tasks.put(book)
+
+    query_queue = queue.Queue()
+    for query in queries:
+        query_queue.put(query)
+
+    with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as detail_pool:
+        workers = [detail_pool.submit(detail_worker, tasks, pbar, state, emit_book) for _ in range(SCRAPE_WORKERS)]
+        try:
+            with ThreadPoolExecutor(max_workers=search_workers) as search_pool:
+                for _ in range(search_workers):
+                    search_pool.submit(search_worker, query_queue, frontier, schedule)
+        finally:
+            for _ in workers:
+                tasks.put(None)
 
     pbar.close()
+    state.close()
+    updated = frontier.updated_since_emitted()
+    for book in updated:
+        update(book)
+    incr('scrape.query_updates', len(updated))
+    books = frontier.books()
 
-    # ================================
-    # GUARDAR JSON FINAL
-    # ================================
     metadata = {
-        "source_urls": [f"https://www.goodreads.com/search?q={SEARCH_QUERY.replace(' ', '+')}"],
+        "source_urls": [f"{GOODREADS_BASE_URL}/search?q={q.replace(' ', '+')}" for q in queries],
         "selectors": {
             "search_title": "a.bookTitle",
             "search_author": "a.authorName",
@@ -217,11 +583,38 @@ def main():
             "isbn_table": "div.CollapsableList td"
         },
         "user_agent": USER_AGENT,
-        "query": SEARCH_QUERY,
+        "query": " | ".join(queries),
+        "queries": queries,
         "scrape_date": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
         "records_extracted": len(books),
-        "rate_limit_seconds": RATE_LIMIT
+        "rate_limit_seconds": RATE_LIMIT,
+        "workers": SCRAPE_WORKERS,
+        "detail_fetch_paths": {"http": FETCH_PATHS["http"], "selenium": FETCH_PATHS["selenium"]},
+        "reused_from_state": reused["books"],
+        "query_updates": len(updated)
     }
+    return books, metadata
+
+
+def main():
+    queries = load_queries()
+    # En NDJSON cada libro se escribe en cuanto está completo
+    writer = NdjsonWriter(OUTPUT_FILE) if OUTPUT_FORMAT == 'ndjson' else None
+    try:
+        write = writer.write if writer is not None else None
+        books, metadata = scrape(queries, emit=write, update=write)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    # ================================
+    # GUARDAR JSON FINAL / METADATOS NDJSON
+    # ================================
+    if writer is not None:
+        # Los registros ya están en el NDJSON; los metadatos van al sidecar
+        append_run_metadata(OUTPUT_FILE, metadata)
+        print(f"[OK] Añadidos {writer.count} registros a {OUTPUT_FILE}.")
+        return
 
     payload = {"metadata": metadata, "data": books}
 
@@ -229,8 +622,8 @@ def main():
         json.dump(payload, f, ensure_ascii=False, indent=2)
 
     print(f"[OK] Guardado {OUTPUT_FILE} con {len(books)} registros.")
-    driver.quit()
 
 
 if __name__ == "__main__":
-    main()
+    with run_report("scrape_goodreads", DOCS_DIR):
+        main()
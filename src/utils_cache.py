@@ -0,0 +1,248 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+
+def normalize_query_url(url):
+    """
+    Forma canónica de una URL de consulta: sin la API key, parámetros
+    ordenados y el texto de `q` en minúsculas y con espacios colapsados.
+    """
+    parts = urlsplit(url)
+    params = []
+    for k, v in parse_qsl(parts.query, keep_blank_values=True):
+        if k == 'key':
+            continue
+        if k == 'q':
+            v = ' '.join(v.lower().split())
+        params.append((k, v))
+    return f"{parts.netloc}{parts.path}?{urlencode(sorted(params))}"
+
+
+def cache_key(url):
+    return hashlib.sha256(normalize_query_url(url).encode('utf-8')).hexdigest()
+
+
+class MemoCache:
+    """
+    Memoización en memoria para una ejecución: LRU acotado a `max_entries`
+    entradas, con coalescencia de peticiones en curso (single-flight): si
+    varios hilos piden a la vez la misma clave, solo uno calcula el valor y
+    los demás esperan su resultado. Los valores None (p. ej. una petición
+    fallida), o los que `cacheable` rechace, se devuelven a quienes
+    esperaban pero no se guardan.
+    Con `max_entries <= 0` no guarda nada (solo coalesce). Se puede compartir
+    entre hilos.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not owner:
+            # Otro hilo ya lo está calculando
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            keep = value is not None and (cacheable is None or cacheable(value))
+            if keep and self.max_entries > 0:
+                self._entries[key] = value
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+            }
+
+
+class ResponseCache:
+    """
+    Caché persistente en SQLite de respuestas JSON, direccionada por el hash
+    de la consulta normalizada. Las entradas caducan tras `ttl_seconds` y,
+    si el total supera `max_bytes`, se eliminan las menos usadas (LRU).
+    Se puede compartir entre hilos.
+    """
+
+    def __init__(self, path, ttl_seconds=30 * 24 * 3600, max_bytes=512 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url):
+        key = cache_key(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, size, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            body, size, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(body)
+
+    def set(self, url, payload):
+        key = cache_key(url)
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+        size = len(body.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, query, body, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, normalize_query_url(url), body, size, now, now)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self.max_bytes and self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Libera hasta quedar en el 90% del máximo, empezando por lo menos usado
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall()
+        to_delete = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            to_delete.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+        self.evictions += len(to_delete)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'size_bytes': self._total_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ScrapeStateStore:
+    """
+    Estado persistente del scraper en SQLite: último registro extraído de cada
+    libro, indexado por `book_url`, con la fecha de extracción. Permite que una
+    ejecución posterior solo visite libros nuevos o caducados.
+    Se puede compartir entre hilos.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS books (
+                book_url TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                last_scraped REAL NOT NULL
+            )
+        """)
+
+    def get_fresh(self, book_url, max_age_seconds):
+        """Registro guardado de `book_url` si se extrajo hace menos de `max_age_seconds`."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record, last_scraped FROM books WHERE book_url = ?", (book_url,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > max_age_seconds:
+            return None
+        return json.loads(row[0])
+
+    def upsert(self, record):
+        body = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO books (book_url, record, last_scraped) VALUES (?, ?, ?)",
+                (record['book_url'], body, time.time())
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
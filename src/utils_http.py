@@ -0,0 +1,176 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """
+    Limitador token-bucket compartido entre hilos.
+
+    `rate` tokens por segundo con ráfagas de hasta `capacity` tokens.
+    Con `rate <= 0` no limita.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Respuestas que indican un problema temporal del servidor o de cuota: se
+# reintentan. El resto de 4xx son errores de la petición y no se reintentan.
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """
+    Espera antes del reintento `attempt` (1 = primer reintento): backoff
+    exponencial con jitter completo, uniforme entre 0 y min(cap, base * 2^(attempt-1)).
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def retry_after_seconds(response):
+    """
+    Segundos indicados por la cabecera Retry-After (número de segundos o
+    fecha HTTP), o None si no viene o no se entiende.
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """
+    Cortacircuitos compartido entre hilos.
+
+    Guarda el resultado de las últimas `window` peticiones; si al menos
+    `min_calls` de ellas tienen una tasa de error >= `error_rate`, se abre
+    durante `cooldown` segundos y `wait()` bloquea a todos los hilos hasta
+    entonces. Después pasa un solo hilo (la sonda) y los demás siguen
+    esperando a su resultado: si falla, se vuelve a abrir; si no, pasan
+    todos. Con `error_rate <= 0` no se abre nunca (salvo con `pause`).
+    """
+
+    def __init__(self, error_rate=0.5, window=20, min_calls=10, cooldown=30.0):
+        self.error_rate = float(error_rate)
+        self.min_calls = max(1, int(min_calls))
+        self.cooldown = float(cooldown)
+        self.opened = 0
+        self._results = deque(maxlen=max(self.min_calls, int(window)))
+        self._open_until = 0.0
+        # Semiabierto: falta el resultado de la sonda, (hilo, instante) si ya salió
+        self._probing = False
+        self._probe = None
+        self._cond = threading.Condition()
+
+    def wait(self):
+        """Bloquea mientras el circuito esté abierto o haya una sonda pendiente de otro hilo."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                remaining = self._open_until - now
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                elif not self._probing:
+                    return
+                elif self._probe is None or now - self._probe[1] >= self.cooldown:
+                    # Este hilo hace de sonda (también si la anterior no informó a tiempo)
+                    self._probe = (threading.get_ident(), now)
+                    return
+                else:
+                    self._cond.wait(self._probe[1] + self.cooldown - now)
+
+    def pause(self, seconds):
+        """Abre el circuito al menos `seconds` segundos (p. ej. por un Retry-After)."""
+        with self._cond:
+            self._open_until = max(self._open_until, time.monotonic() + seconds)
+
+    def record(self, success):
+        """Registra el resultado de una petición; devuelve True si el circuito se abre."""
+        with self._cond:
+            if self._probing:
+                if self._probe is None or self._probe[0] != threading.get_ident():
+                    # Petición que salió antes de abrirse el circuito: no cuenta
+                    return False
+                self._probing = False
+                self._probe = None
+                self._cond.notify_all()
+                if not success:
+                    return self._open()
+            self._results.append(bool(success))
+            if self.error_rate <= 0 or success or len(self._results) < self.min_calls:
+                return False
+            errors = self._results.count(False)
+            if errors / len(self._results) >= self.error_rate:
+                return self._open()
+            return False
+
+    def _open(self):
+        # Con el lock tomado
+        self._open_until = max(self._open_until, time.monotonic() + self.cooldown)
+        self._results.clear()
+        self._probing = True
+        self._probe = None
+        self.opened += 1
+        return True
+
+
+def build_session(headers=None, pool_maxsize=10, pool_connections=None, pool_block=False):
+    """
+    Sesión de requests con conexiones keep-alive reutilizables entre hilos.
+
+    `pool_maxsize` conexiones por host y `pool_connections` hosts en caché
+    (por defecto igual que `pool_maxsize`). Con `pool_block=True`, si todas
+    las conexiones están ocupadas se espera a que se libere una en lugar de
+    abrir otra que se cierra al terminar.
+    """
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections or pool_maxsize, pool_maxsize=pool_maxsize, pool_block=pool_block
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def wire_bytes(response):
+    """
+    Bytes del cuerpo recibidos por la red (comprimidos si la respuesta venía
+    con gzip); si no se pueden saber, los del cuerpo ya descomprimido.
+    """
+    try:
+        received = response.raw.tell()
+    except (AttributeError, OSError):
+        received = 0
+    return received or len(response.content)
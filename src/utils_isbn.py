@@ -1,4 +1,7 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 def validate_isbn13(isbn):
     if pd.isnull(isbn):
@@ -8,4 +11,156 @@ def validate_isbn13(isbn):
         return False
     total = sum(int(digit) * (1 if i % 2 == 0 else 3) for i, digit in enumerate(isbn[:-1]))
     checksum = (10 - (total % 10)) % 10
-    return checksum == int(isbn[-1])
\ No newline at end of file
+    return checksum == int(isbn[-1])
+
+def validate_isbn10(isbn):
+    if pd.isnull(isbn):
+        return False
+    isbn = str(isbn).replace('-', '').replace(' ', '').upper()
+    if len(isbn) != 10 or not isbn[:9].isdigit() or not (isbn[9].isdigit() or isbn[9] == 'X'):
+        return False
+    total = sum(int(digit) * (10 - i) for i, digit in enumerate(isbn[:9]))
+    total += 10 if isbn[9] == 'X' else int(isbn[9])
+    return total % 11 == 0
+
+def isbn10_to_isbn13(isbn):
+    if not validate_isbn10(isbn):
+        return None
+    core = '978' + str(isbn).replace('-', '').replace(' ', '')[:9]
+    total = sum(int(digit) * (1 if i % 2 == 0 else 3) for i, digit in enumerate(core))
+    return core + str((10 - (total % 10)) % 10)
+
+# =============================================================================
+# VERSIONES VECTORIZADAS (columnas pandas / Arrow completas)
+# =============================================================================
+# Se trabaja directamente sobre los buffers de Arrow: cada posición del
+# identificador es un array NumPy uint8 contiguo (matriz 13 x N), así que las
+# sumas de control son unas pocas operaciones sobre arrays, sin objetos Python.
+
+_WIDTH = 13
+_ZERO = ord('0')
+_ISBN13_WEIGHTS = [1, 3] * 6
+_ISBN10_WEIGHTS = list(range(10, 1, -1))
+_SEPARATORS = (ord('-'), ord(' '))
+
+def _to_arrow_strings(values):
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        arr = values
+    else:
+        try:
+            arr = pa.array(values, type=pa.string(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Columnas object con tipos mezclados (p. ej. números leídos del CSV)
+            series = pd.Series(values, dtype=object)
+            arr = pa.array(series.map(str, na_action='ignore'), type=pa.string(), from_pandas=True)
+    # Las Series respaldadas por Arrow se convierten en ChunkedArray
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    if not pa.types.is_string(arr.type) and not pa.types.is_large_string(arr.type):
+        arr = pc.cast(arr, pa.string())
+    return arr
+
+def _isbn_columns(values):
+    """
+    Matriz uint8 (13 x N) con los identificadores sin guiones ni espacios y la
+    longitud en bytes de cada uno (0 para nulos). Las posiciones más allá de la
+    longitud de cada identificador no están definidas: las comprobaciones
+    siempre exigen antes la longitud exacta.
+    """
+    arr = _to_arrow_strings(values)
+    n = len(arr)
+    offset_type = np.int64 if pa.types.is_large_string(arr.type) else np.int32
+    offsets = np.frombuffer(arr.buffers()[1], dtype=offset_type)[arr.offset:arr.offset + n + 1]
+    data_buf = arr.buffers()[2]
+    data = np.frombuffer(data_buf, dtype=np.uint8) if data_buf is not None else np.empty(0, dtype=np.uint8)
+    data = data[offsets[0]:offsets[-1]]
+    offsets = offsets - offsets[0]
+
+    # Quitar separadores a nivel de byte (solo si hay alguno)
+    keep = (data != _SEPARATORS[0]) & (data != _SEPARATORS[1])
+    if not keep.all():
+        kept = np.empty(len(keep) + 1, dtype=np.int64 if len(keep) >= 2**31 else np.int32)
+        kept[0] = 0
+        np.cumsum(keep, out=kept[1:])
+        offsets = kept[offsets]
+        data = data[keep]
+
+    lengths = np.diff(offsets)
+    if arr.null_count:
+        lengths[arr.is_null().to_numpy(zero_copy_only=False)] = 0
+
+    # Fila i = byte i de cada identificador: una lectura por posición sobre
+    # el buffer (con margen al final para no salirse)
+    padded = np.concatenate((data, np.zeros(_WIDTH, dtype=np.uint8)))
+    starts = offsets[:-1].astype(np.intp)
+    columns = np.empty((_WIDTH, n), dtype=np.uint8)
+    for i in range(_WIDTH):
+        np.take(padded[i:], starts, out=columns[i])
+    return columns, lengths
+
+def _weighted_sum(digits, weights):
+    # uint16 basta incluso para filas no numéricas (255 * 10 * 12 < 65536)
+    total = np.zeros(digits.shape[1], dtype=np.uint16)
+    for i, w in enumerate(weights):
+        total += digits[i] * np.uint16(w)
+    return total
+
+def _isbn13_mask(digits, lengths):
+    valid = (lengths == 13) & (digits <= 9).all(axis=0)
+    check = (10 - _weighted_sum(digits, _ISBN13_WEIGHTS) % 10) % 10
+    return valid & (check == digits[12])
+
+def _isbn10_mask(digits, lengths):
+    # Con el desplazamiento a '0', 'X' y 'x' quedan en 40 y 72
+    last = digits[9]
+    last_is_x = (last == ord('X') - _ZERO) | (last == ord('x') - _ZERO)
+    valid = (lengths == 10) & (digits[:9] <= 9).all(axis=0) & ((last <= 9) | last_is_x)
+    last_value = np.where(last_is_x, np.uint16(10), last.astype(np.uint16))
+    return valid & ((_weighted_sum(digits, _ISBN10_WEIGHTS) + last_value) % 11 == 0)
+
+def _isbn10_to_13_digits(digits):
+    out = np.empty_like(digits)
+    out[:3] = np.array([9, 7, 8], dtype=np.uint8)[:, None]
+    out[3:12] = digits[:9]
+    out[12] = (10 - _weighted_sum(out, _ISBN13_WEIGHTS) % 10) % 10
+    return out
+
+def _digits_to_strings(digits, mask):
+    n = digits.shape[1]
+    data = np.ascontiguousarray((digits + _ZERO).T)
+    offsets = np.arange(0, (n + 1) * _WIDTH, _WIDTH, dtype=np.int32)
+    validity = pa.array(mask, type=pa.bool_()).buffers()[1] if not mask.all() else None
+    return pa.Array.from_buffers(pa.string(), n, [validity, pa.py_buffer(offsets), pa.py_buffer(data)])
+
+def _like_input(values, arr):
+    if isinstance(values, pd.Series):
+        # set_axis y no index=: con index= pandas reindexaría por etiqueta
+        return arr.to_pandas().set_axis(values.index).rename(values.name)
+    return arr
+
+def _isbn_digits(values):
+    columns, lengths = _isbn_columns(values)
+    # Los bytes que no son dígitos quedan > 9 al restar '0' (uint8 desborda)
+    return columns - np.uint8(_ZERO), lengths
+
+def validate_isbn13_array(values):
+    """Máscara NumPy booleana: ISBN-13 válido (admite guiones y espacios)."""
+    digits, lengths = _isbn_digits(values)
+    return _isbn13_mask(digits, lengths)
+
+def validate_isbn10_array(values):
+    """Máscara NumPy booleana: ISBN-10 válido (admite guiones, espacios y 'x')."""
+    digits, lengths = _isbn_digits(values)
+    return _isbn10_mask(digits, lengths)
+
+def canonicalize_isbn_array(values):
+    """
+    Forma canónica ISBN-13 de cada identificador: el propio ISBN-13 normalizado
+    si es válido, la conversión si es un ISBN-10 válido, nulo en otro caso.
+    Devuelve una Series si la entrada es una Series, si no un pyarrow.Array.
+    """
+    digits, lengths = _isbn_digits(values)
+    valid13 = _isbn13_mask(digits, lengths)
+    valid10 = _isbn10_mask(digits, lengths)
+    canonical = np.where(valid13, digits, _isbn10_to_13_digits(digits))
+    return _like_input(values, _digits_to_strings(canonical, valid13 | valid10))
@@ -0,0 +1,333 @@
+"""
+Lectura de los ficheros de landing como lotes de Arrow (RecordBatch), sin
+cargar el fichero entero en objetos Python:
+
+- CSV de Google Books con el lector por bloques de pyarrow.csv.
+- NDJSON (un registro por línea) con el lector por bloques de pyarrow.json.
+- JSON de Goodreads ({"metadata": ..., "data": [...]}) recorriendo el array
+  `data` registro a registro.
+
+También incluye la escritura incremental en NDJSON (NdjsonWriter), con los
+metadatos de cada ejecución en un fichero sidecar `<nombre>.meta.json`.
+
+La memoria de la lectura queda acotada por el tamaño del lote; quien
+consuma los lotes decide si los acumula (read_*_table) o los procesa uno a
+uno (iter_*_batches).
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.json as pajson
+
+BATCH_ROWS = 50_000
+BLOCK_SIZE = 16 * 1024 * 1024
+CHUNK_CHARS = 1024 * 1024
+
+# Tipos fijos de las columnas conocidas: los ISBN y las fechas siempre como
+# texto (sin inferir enteros ni fechas) y los números como tales
+GOODREADS_TYPES = {
+    'title': pa.string(),
+    'author': pa.string(),
+    'rating': pa.float64(),
+    'ratings_count': pa.int64(),
+    'book_url': pa.string(),
+    'isbn10': pa.string(),
+    'isbn13': pa.string(),
+    'scrape_source': pa.string(),
+    'scrape_date': pa.string(),
+    'queries': pa.list_(pa.string()),
+}
+GOOGLEBOOKS_TYPES = {
+    'gb_id': pa.string(),
+    'title': pa.string(),
+    'subtitle': pa.string(),
+    'authors': pa.string(),
+    'publisher': pa.string(),
+    'pub_date': pa.string(),
+    'language': pa.string(),
+    'categories': pa.string(),
+    'isbn13': pa.string(),
+    'isbn10': pa.string(),
+    'price_amount': pa.float64(),
+    'price_currency': pa.string(),
+    'query_used': pa.string(),
+}
+
+
+# =============================================================================
+# CSV
+# =============================================================================
+def iter_csv_batches(path, column_types=GOOGLEBOOKS_TYPES, block_size=BLOCK_SIZE):
+    """Lotes de un CSV con cabecera; las celdas vacías se leen como nulos."""
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+    for batch in reader:
+        yield batch
+
+
+# =============================================================================
+# JSON
+# =============================================================================
+def iter_ndjson_batches(path, column_types=GOODREADS_TYPES, block_size=BLOCK_SIZE):
+    """
+    Lotes de un fichero NDJSON (un objeto JSON por línea). Las columnas
+    conocidas tienen tipo fijo (siempre presentes, a nulo si faltan); el
+    resto se infiere.
+    """
+    reader = pajson.open_json(
+        path,
+        read_options=pajson.ReadOptions(block_size=block_size),
+        parse_options=pajson.ParseOptions(
+            explicit_schema=pa.schema(column_types), unexpected_field_behavior='infer'
+        ),
+    )
+    for batch in reader:
+        yield batch
+
+
+class _JsonStream:
+    """Lector incremental de un documento JSON: decodifica valor a valor."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(CHUNK_CHARS)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Siguiente carácter que no sea espacio (sin consumirlo), '' al final."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON inesperado: se esperaba {char!r} en la posición {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Valor cortado al final del buffer: leer más y reintentar
+                if not self._fill():
+                    raise
+                continue
+            # Un número al final del buffer podría seguir en el siguiente bloque
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+def iter_json_array_records(path, key='data'):
+    """Registros del array `key` de un documento JSON, uno a uno."""
+    with open(path, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f)
+        stream.expect('{')
+        while stream.peek() != '}':
+            name = stream.value()
+            stream.expect(':')
+            if name != key:
+                stream.value()
+            else:
+                stream.expect('[')
+                while stream.peek() != ']':
+                    yield stream.value()
+                    if stream.peek() == ',':
+                        stream.expect(',')
+                stream.expect(']')
+            if stream.peek() == ',':
+                stream.expect(',')
+
+def iter_json_batches(path, key='data', column_types=GOODREADS_TYPES, batch_rows=BATCH_ROWS):
+    """Lotes de Arrow con los registros del array `key` de un documento JSON."""
+    records = []
+    for record in iter_json_array_records(path, key):
+        records.append(record)
+        if len(records) >= batch_rows:
+            yield records_to_batch(records, column_types)
+            records = []
+    if records:
+        yield records_to_batch(records, column_types)
+
+def _column(values, type):
+    try:
+        return pa.array(values, type=type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if type is None or not pa.types.is_string(type):
+            raise
+        # Texto con valores de otros tipos (p. ej. ISBN guardados como número)
+        return pa.array([None if v is None else str(v) for v in values], type=type)
+
+def records_to_batch(records, column_types=GOODREADS_TYPES):
+    """Lote de Arrow con una lista de dicts, con los mismos tipos que al leer landing."""
+    names = list(dict.fromkeys(k for r in records for k in r))
+    arrays = [_column([r.get(n) for r in records], column_types.get(n)) for n in names]
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+# =============================================================================
+# NDJSON: ESCRITURA INCREMENTAL Y LECTURA REGISTRO A REGISTRO
+# =============================================================================
+def _truncate_partial_line(path, block=64 * 1024):
+    # Una caída a mitad de escritura deja la última línea incompleta
+    size = path.stat().st_size
+    with open(path, 'r+b') as f:
+        end = size
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            data = f.read(end - start)
+            if end == size and data.endswith(b'\n'):
+                return
+            cut = data.rfind(b'\n')
+            if cut >= 0:
+                f.truncate(start + cut + 1)
+                return
+            end = start
+        f.truncate(0)
+
+class NdjsonWriter:
+    """
+    Añade registros a un fichero NDJSON, uno por línea, conservando lo que ya
+    hubiera de ejecuciones anteriores. Cada registro se vuelca al disco al
+    escribirlo, así que un lector concurrente ve siempre líneas completas.
+    Se puede compartir entre hilos.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size:
+            _truncate_partial_line(self.path)
+        self.count = 0
+        self._lock = threading.Lock()
+        self._f = open(self.path, 'a', encoding='utf-8')
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def sidecar_path(path):
+    """Fichero de metadatos de un NDJSON: goodreads_books.ndjson -> goodreads_books.meta.json"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}.meta.json")
+
+def append_run_metadata(path, metadata):
+    """Añade los metadatos de una ejecución al sidecar del NDJSON `path`."""
+    meta_path = sidecar_path(path)
+    if meta_path.exists():
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+    else:
+        sidecar = {'data_file': Path(path).name, 'format': 'ndjson', 'runs': []}
+    sidecar['runs'].append(metadata)
+    tmp_path = meta_path.with_name(meta_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(sidecar, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, meta_path)
+
+def iter_ndjson_records(path):
+    """Registros de un NDJSON uno a uno; una última línea a medias se ignora."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith('\n'):
+                    raise
+                return
+
+def iter_latest_records(path, key):
+    """
+    Para un NDJSON con varias versiones del mismo registro (ejecuciones
+    añadidas), solo la última de cada `key(registro)`. Hace dos pasadas
+    sobre el fichero; en memoria solo quedan las claves.
+    """
+    last = {}
+    for i, record in enumerate(iter_ndjson_records(path)):
+        last[key(record)] = i
+    for i, record in enumerate(iter_ndjson_records(path)):
+        if last.get(key(record)) == i:
+            yield record
+
+def iter_goodreads_records(path):
+    """Libros de Goodreads como dicts, en streaming, desde .json o .ndjson."""
+    if Path(path).suffix.lower() in ('.ndjson', '.jsonl'):
+        return iter_latest_records(path, key=lambda r: r.get('book_url'))
+    return iter_json_array_records(path)
+
+
+# =============================================================================
+# TABLAS COMPLETAS
+# =============================================================================
+def iter_landing_batches(path, **kwargs):
+    """Lotes de un fichero de landing según su extensión (.csv, .ndjson/.jsonl, .json)."""
+    suffix = Path(path).suffix.lower()
+    if suffix == '.csv':
+        return iter_csv_batches(path, **kwargs)
+    if suffix in ('.ndjson', '.jsonl'):
+        return iter_ndjson_batches(path, **kwargs)
+    if suffix == '.json':
+        return iter_json_batches(path, **kwargs)
+    raise ValueError(f"Formato de landing no soportado: {path}")
+
+def to_pandas(table):
+    """
+    DataFrame de una tabla de landing. Las columnas lista quedan como listas
+    de Python (pyarrow las convertiría en arrays NumPy), igual que al leer el
+    JSON con json.load.
+    """
+    df = table.to_pandas()
+    for name in table.column_names:
+        if pa.types.is_list(table.schema.field(name).type):
+            df[name] = pd.Series(table.column(name).to_pylist(), index=df.index, dtype=object)
+    return df
+
+def read_landing_table(path, **kwargs):
+    """
+    Tabla Arrow con todo el fichero. Los lotes con columnas distintas se
+    unifican (las que faltan quedan a nulo).
+    """
+    tables = [pa.Table.from_batches([b]) for b in iter_landing_batches(path, **kwargs) if b.num_rows]
+    if not tables:
+        return pa.table({})
+    return pa.concat_tables(tables, promote_options='permissive')
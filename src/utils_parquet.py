@@ -0,0 +1,107 @@
+import os
+import shutil
+from pathlib import Path
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Valor de partición para los nulos: con el directorio por defecto de hive
+# (HIVE_NULL_PARTITION) pd.read_parquet falla al leer la columna de partición
+NULL_PARTITION = '__NULL__'
+HIVE_NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+def read_table(path, schema=None):
+    """
+    Lee un fichero Parquet o un dataset particionado (directorio hive). Con
+    `schema`, devuelve las columnas en ese orden y con esos tipos (la
+    columna de partición se lee del nombre del directorio y NULL_PARTITION
+    vuelve a ser nulo).
+    """
+    path = Path(path)
+    dataset = ds.dataset(path, format='parquet', partitioning='hive' if path.is_dir() else None)
+    table = dataset.to_table()
+    if dataset.partitioning is not None:
+        for name in dataset.partitioning.schema.names:
+            column = _decoded(table[name])
+            if pa.types.is_string(column.type):
+                null = pc.equal(column, NULL_PARTITION)
+                i = table.schema.get_field_index(name)
+                table = table.set_column(i, name, pc.if_else(null, pa.scalar(None, pa.string()), column))
+    if schema is not None:
+        table = table.select(schema.names).cast(schema)
+    return table
+
+
+def _decoded(values):
+    if pa.types.is_dictionary(values.type):
+        return pc.cast(values, values.type.value_type)
+    return values
+
+
+def _partition_values(values):
+    # Valores de partición como texto, con NULL_PARTITION en lugar de nulo
+    return pc.fill_null(pc.cast(_decoded(values), pa.string()), NULL_PARTITION)
+
+
+def _partition_dir(path, column, value):
+    return path / f"{column}={quote(str(value), safe='')}"
+
+
+def _remove(path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def _is_partitioned_by(path, column):
+    # Los datasets con la partición nula de hive se reescriben enteros
+    return (path.is_dir() and any(p.name.startswith(f"{column}=") for p in path.iterdir())
+            and not _partition_dir(path, column, HIVE_NULL_PARTITION).exists())
+
+
+def write_table(table, path, partition_by=None, compression='zstd', row_group_size=None, partitions=None):
+    """
+    Escribe `table` en `path` con la compresión y el tamaño de row group
+    indicados (las estadísticas min/max por row group se escriben siempre).
+
+    Sin `partition_by` se genera un único fichero. Con `partition_by`, `path`
+    es un directorio hive con un subdirectorio por valor de esa columna (los
+    nulos en `<columna>=__NULL__`). Si además se indica `partitions` (valores
+    de partición afectados), solo se reescriben esos subdirectorios y el
+    resto del dataset no se toca.
+    """
+    path = Path(path)
+    if not partition_by:
+        if path.is_dir():
+            shutil.rmtree(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        pq.write_table(table, tmp_path, compression=compression, row_group_size=row_group_size)
+        os.replace(tmp_path, path)
+        return
+
+    table = table.set_column(
+        table.schema.get_field_index(partition_by), partition_by, _partition_values(table[partition_by])
+    )
+    if partitions is None or not _is_partitioned_by(path, partition_by):
+        # Reescritura completa (también si el dataset previo tenía otro formato)
+        _remove(path)
+    else:
+        values = _partition_values(partitions).unique()
+        table = table.filter(pc.is_in(table[partition_by], value_set=values))
+        # Particiones que se quedan sin filas: se eliminan a mano
+        written = set(table[partition_by].unique().to_pylist())
+        for value in values.to_pylist():
+            if value not in written:
+                _remove(_partition_dir(path, partition_by, value))
+
+    if table.num_rows:
+        pq.write_to_dataset(
+            table, path, partition_cols=[partition_by],
+            existing_data_behavior='delete_matching',
+            compression=compression, row_group_size=row_group_size,
+        )
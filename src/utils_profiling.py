@@ -0,0 +1,221 @@
+"""
+Instrumentación compartida por las etapas del pipeline: temporizadores,
+contadores e histogramas en un registro común (METRICS), y un informe
+estructurado por ejecución en docs/run_report.json (junto a
+quality_metrics.json).
+
+    from utils_profiling import timer, incr, observe
+
+    with timer('integrate.merge_sources'):
+        ...
+    incr('google_books.bytes', len(r.content))
+
+Cada script envuelve su main() en `run_report(nombre, docs_dir)`, que al
+terminar escribe su sección del informe (sin tocar las de otros scripts).
+Con PIPELINE_PROFILE=cprofile, tracemalloc o all se añade además el perfil
+de CPU (cProfile, solo del hilo principal; fichero .prof en docs/) y/o las
+líneas que más memoria reservan (tracemalloc).
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPORT_FILE = 'run_report.json'
+PROFILE_TOP = 25
+# Límites (en segundos) de los buckets de los histogramas de tiempos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+# =============================================================================
+# REGISTRO DE MÉTRICAS
+# =============================================================================
+class Histogram:
+    """Número de observaciones, suma, mínimo, máximo y conteo por bucket."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+
+    def to_dict(self):
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            'count': self.count,
+            'total': round(self.total, 6),
+            'mean': round(self.total / self.count, 6) if self.count else None,
+            'min': None if self.min is None else round(self.min, 6),
+            'max': None if self.max is None else round(self.max, 6),
+            'buckets': {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+
+class Instrumentation:
+    """Registro de contadores e histogramas, seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name):
+        """Mide el bloque y lo añade al histograma `name` (en segundos), también si falla."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'timers_s': {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+
+METRICS = Instrumentation()
+incr = METRICS.incr
+observe = METRICS.observe
+timer = METRICS.timer
+
+
+# =============================================================================
+# PERFILADO OPCIONAL
+# =============================================================================
+class Profiler:
+    """cProfile y/o tracemalloc según `mode` ('', 'cprofile', 'tracemalloc' o 'all')."""
+
+    def __init__(self, mode):
+        mode = (mode or '').strip().lower()
+        if mode not in ('', 'cprofile', 'tracemalloc', 'all'):
+            raise ValueError(f"PIPELINE_PROFILE no válido: {mode} (cprofile | tracemalloc | all)")
+        self.cprofile = cProfile.Profile() if mode in ('cprofile', 'all') else None
+        self.tracemalloc = mode in ('tracemalloc', 'all')
+
+    def start(self):
+        if self.tracemalloc:
+            tracemalloc.start(10)
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def stop(self, docs_dir, component):
+        """Para el perfilado y devuelve el resumen para el informe."""
+        summary = {}
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            Path(docs_dir).mkdir(parents=True, exist_ok=True)
+            prof_path = Path(docs_dir) / f"profile_{component}.prof"
+            self.cprofile.dump_stats(prof_path)
+            stats = pstats.Stats(self.cprofile)
+            top = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:PROFILE_TOP]
+            summary['cprofile'] = {
+                'file': str(prof_path),
+                'top_cumulative': [
+                    {'function': f"{Path(file).name}:{line}({func})", 'calls': nc,
+                     'tottime_s': round(tt, 4), 'cumtime_s': round(ct, 4)}
+                    for (file, line, func), (cc, nc, tt, ct, callers) in top
+                ],
+            }
+        if self.tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            summary['tracemalloc'] = {
+                'current_mb': round(current / 1024 / 1024, 2),
+                'peak_mb': round(peak / 1024 / 1024, 2),
+                'top_lines': [
+                    {'line': str(stat.traceback[0]), 'size_mb': round(stat.size / 1024 / 1024, 3), 'blocks': stat.count}
+                    for stat in snapshot.statistics('lineno')[:PROFILE_TOP]
+                ],
+            }
+        return summary
+
+
+# =============================================================================
+# INFORME DE EJECUCIÓN
+# =============================================================================
+def write_report_section(docs_dir, component, section):
+    """Guarda `section` como la entrada `component` de docs/run_report.json."""
+    path = Path(docs_dir) / REPORT_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    report = {}
+    if path.exists():
+        try:
+            report = json.loads(path.read_text(encoding='utf-8'))
+        except ValueError:
+            report = {}
+    report[component] = section
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+@contextmanager
+def run_report(component, docs_dir, profile=None):
+    """
+    Mide una ejecución completa de `component` y al salir escribe su sección
+    del informe (tiempos, contadores y perfil), también si la ejecución
+    falla. `profile` por defecto es la variable PIPELINE_PROFILE.
+    """
+    METRICS.reset()
+    profiler = Profiler(os.getenv('PIPELINE_PROFILE', '') if profile is None else profile)
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    status = 'ok'
+    profiler.start()
+    try:
+        yield METRICS
+    except BaseException as e:
+        status = f"error: {type(e).__name__}"
+        raise
+    finally:
+        profile_summary = profiler.stop(docs_dir, component)
+        section = {
+            'started_at': started_at.isoformat(),
+            'finished_at': datetime.now(timezone.utc).isoformat(),
+            'wall_s': round(time.perf_counter() - start, 3),
+            'status': status,
+            **METRICS.snapshot(),
+        }
+        if profile_summary:
+            section['profile'] = profile_summary
+        path = write_report_section(docs_dir, component, section)
+        print(f"[INFO] Informe de ejecución: {path}")
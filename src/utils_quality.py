@@ -1,95 +1,224 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Comprobaciones de validate_types_and_formats, en orden: si una fila falla
+# varias, su 'validation_flag' es la última que falla
+VALIDATION_FLAGS = [
+    'null_title',
+    'invalid_isbn_format',
+    'invalid_date',
+    'invalid_language',
+    'invalid_currency',
+    'invalid_price',
+    'invalid_price_range',
+]
+# Máscara de bits -> flag del bit más alto activo (0 -> 'valid')
+_FLAG_BY_BITS = np.array(
+    ['valid'] + [VALIDATION_FLAGS[bits.bit_length() - 1] for bits in range(1, 2 ** len(VALIDATION_FLAGS))],
+    dtype=object
+)
+# Valores que cuentan como vacíos además de los nulos
+_EMPTY_VALUES = pa.array(['', 'nan'])
+
+
+def _text(series, convert=False):
+    """
+    Columna de texto como pyarrow.StringArray (los nulos se mantienen). Los
+    valores que no son texto se convierten con str() si `convert` (como
+    `astype(str)`); si no, quedan a nulo. None si la columna no tiene texto.
+    """
+    if series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+        try:
+            arr = pa.array(series, type=pa.string(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Tipos mezclados (p. ej. listas o números junto a texto)
+            to_text = str if convert else (lambda v: v if isinstance(v, str) else None)
+            arr = pa.array(series.map(to_text, na_action='ignore'), type=pa.string(), from_pandas=True)
+    elif convert:
+        arr = pa.array(series.map(str, na_action='ignore'), type=pa.string(), from_pandas=True)
+    else:
+        return None
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    return arr
+
+
+def _to_numpy(mask):
+    return pc.fill_null(mask, False).to_numpy(zero_copy_only=False)
+
+
+def _empty_mask(series):
+    """Máscara NumPy: nulo, '' o 'nan'."""
+    mask = series.isnull().to_numpy(copy=True)
+    arr = _text(series)
+    if arr is not None:
+        mask |= _to_numpy(pc.is_in(arr, value_set=_EMPTY_VALUES))
+    return mask
+
+
+def normalize_empty(df):
+    """Copia de `df` con '', 'nan' y None como np.nan (sin modificar `df`)."""
+    replaced = {}
+    for col in df.columns:
+        mask = _empty_mask(df[col])
+        if mask.any():
+            replaced[col] = df[col].where(~mask, np.nan)
+    return df.assign(**replaced)
+
+
+def _no_match(series, pattern):
+    """Máscara NumPy: el texto (como `astype(str)`) no cumple `pattern`; los nulos no lo cumplen."""
+    return ~_to_numpy(pc.match_substring_regex(_text(series, convert=True), pattern))
+
+
+def _parse_date(value):
+    try:
+        return pd.to_datetime(value, errors='coerce')
+    except (ValueError, TypeError, OverflowError):
+        return pd.NaT
+
+
+def _invalid_dates(series):
+    """
+    Máscara NumPy: valor no nulo que pd.to_datetime no interpreta. Cada valor
+    distinto se analiza una sola vez.
+    """
+    present = series.notnull().to_numpy()
+    values = series[present]
+    uniques = pd.unique(values.to_numpy(dtype=object))
+    valid = pd.to_datetime(pd.Series(uniques, dtype=object), format='mixed', errors='coerce', utc=True).notnull()
+    # El análisis por valor admite fechas fuera del rango en nanosegundos
+    for i in np.flatnonzero(~valid.to_numpy()):
+        valid.iloc[i] = pd.notnull(_parse_date(uniques[i]))
+    invalid = np.zeros(len(series), dtype=bool)
+    invalid[present] = ~pd.Series(valid.to_numpy(), index=uniques).reindex(values.to_numpy(dtype=object)).to_numpy(dtype=bool)
+    return invalid
+
+
+def validation_bits(df):
+    """
+    Máscara de bits por fila (uint8): el bit i está activo si la fila falla
+    la comprobación VALIDATION_FLAGS[i]. `df` ya normalizado (normalize_empty)
+    y con `price_amount` numérico.
+    """
+    checks = [
+        ('title', lambda s: s.isnull().to_numpy()),
+        ('isbn13', lambda s: _no_match(s, r'^\d{13}$')),
+        ('pub_date', _invalid_dates),
+        ('language', lambda s: _no_match(s, r'^[a-z]{2,3}(-[A-Z]{2})?$')),
+        ('price_currency', lambda s: _no_match(s, r'^[A-Z]{3}$')),
+        ('price_amount', lambda s: s.isnull().to_numpy()),
+        ('price', lambda s: ((s <= 0) | (s > 1000)).to_numpy(dtype=bool)),
+    ]
+    bits = np.zeros(len(df), dtype=np.uint8)
+    for i, (col, failed) in enumerate(checks):
+        if col in df:
+            bits |= failed(df[col]).astype(np.uint8) << i
+    return bits
+
 
 def validate_types_and_formats(df, source):
     """
     Valida tipos y formatos en el DataFrame y marca las filas con 'validation_flag'.
+    Todas las comprobaciones se combinan en una máscara de bits por fila
+    (validation_bits); si una fila falla varias, gana la última de VALIDATION_FLAGS.
     """
     # Normalizar valores vacíos a np.nan
-    df = df.replace({'': np.nan, 'nan': np.nan, None: np.nan})
-    
-    # Inicializar flag
-    df['validation_flag'] = 'valid'
-    
+    df = normalize_empty(df)
+
     # Títulos
     if 'title' in df:
         null_titles_ratio = df['title'].isnull().mean()
         if null_titles_ratio > 0.1:
             raise AssertionError(f"Too many null titles in {source}: {null_titles_ratio*100:.2f}%")
-        df.loc[df['title'].isnull(), 'validation_flag'] = 'null_title'
-    
-    # ISBN-13
-    if 'isbn13' in df:
-        df.loc[~df['isbn13'].astype(str).str.match(r'^\d{13}$', na=False), 'validation_flag'] = 'invalid_isbn_format'
-    
-    # Fecha de publicación
-    if 'pub_date' in df:
-        def is_valid_date(d):
-            try:
-                return pd.notnull(pd.to_datetime(d, errors='coerce'))
-            except:
-                return False
-        invalid_dates = ~df['pub_date'].apply(is_valid_date) & df['pub_date'].notnull()
-        df.loc[invalid_dates, 'validation_flag'] = 'invalid_date'
-    
-    # Idioma
-    if 'language' in df:
-        df.loc[~df['language'].astype(str).str.match(r'^[a-z]{2,3}(-[A-Z]{2})?$', na=False), 'validation_flag'] = 'invalid_language'
-    
-    # Moneda
-    if 'price_currency' in df:
-        df.loc[~df['price_currency'].astype(str).str.match(r'^[A-Z]{3}$', na=False), 'validation_flag'] = 'invalid_currency'
-    
+
     # Precio numérico
     if 'price_amount' in df:
         df['price_amount'] = pd.to_numeric(df['price_amount'], errors='coerce')
-        df.loc[df['price_amount'].isnull(), 'validation_flag'] = 'invalid_price'
-    
-    # Precio normalizado (después de convertir)
-    if 'price' in df:
-        df.loc[(df['price'] <= 0) | (df['price'] > 1000), 'validation_flag'] = 'invalid_price_range'
-    
+
+    df['validation_flag'] = _FLAG_BY_BITS[validation_bits(df)]
     return df
 
 
+class QualityMetrics:
+    """
+    Métricas de calidad de Goodreads y Google Books a partir de conteos, así
+    que se pueden calcular por lotes (add) y combinar (merge): el resultado
+    de to_dict es el mismo que con todas las filas juntas.
+    """
+
+    SOURCES = ('goodreads', 'googlebooks')
+
+    def __init__(self):
+        self.counts = {
+            source: {'row_count': 0, 'null_counts': {}, 'flag_counts': {}}
+            for source in self.SOURCES
+        }
+
+    def _add_counts(self, source, row_count, null_counts, flag_counts):
+        counts = self.counts[source]
+        # Una columna que falta en uno de los lotes cuenta como nula en sus filas
+        for col in counts['null_counts']:
+            if col not in null_counts:
+                counts['null_counts'][col] += row_count
+        for col, n in null_counts.items():
+            counts['null_counts'][col] = counts['null_counts'].get(col, counts['row_count']) + n
+        for flag, n in flag_counts.items():
+            counts['flag_counts'][flag] = counts['flag_counts'].get(flag, 0) + n
+        counts['row_count'] += row_count
+
+    def add(self, df_gr, df_gb):
+        """Añade un lote de cada fuente (con 'validation_flag')."""
+        for source, df in [('goodreads', df_gr), ('googlebooks', df_gb)]:
+            null_counts = {col: int(_empty_mask(df[col]).sum()) for col in df.columns}
+            flag_counts = {flag: int(n) for flag, n in df['validation_flag'].value_counts().items()}
+            self._add_counts(source, len(df), null_counts, flag_counts)
+        return self
+
+    def merge(self, other):
+        """Suma las métricas de `other` (otro lote u otra ejecución)."""
+        for source in self.SOURCES:
+            self._add_counts(source, **other.counts[source])
+        return self
+
+    def _valid_percent(self, flag, column):
+        # Porcentaje de filas sin `flag` en cada fuente (100 si no tiene `column`)
+        percents = []
+        for source in self.SOURCES:
+            counts = self.counts[source]
+            if column not in counts['null_counts']:
+                percents.append(100)
+            elif counts['row_count']:
+                percents.append((counts['row_count'] - counts['flag_counts'].get(flag, 0)) / counts['row_count'] * 100)
+            else:
+                percents.append(np.nan)
+        return np.mean(percents)
+
+    def to_dict(self):
+        metrics = {}
+        for source in self.SOURCES:
+            counts = self.counts[source]
+            rows = counts['row_count']
+            metrics[source] = {
+                'row_count': rows,
+                'null_percent': {
+                    col: (n / rows * 100 if rows else np.nan) for col, n in counts['null_counts'].items()
+                },
+                'valid_rows_percent': (counts['flag_counts'].get('valid', 0) / rows * 100 if rows else np.nan)
+            }
+
+        # Métricas globales
+        metrics['total_rows'] = sum(self.counts[source]['row_count'] for source in self.SOURCES)
+        metrics['valid_dates_percent'] = self._valid_percent('invalid_date', 'pub_date')
+        metrics['valid_languages_percent'] = self._valid_percent('invalid_language', 'language')
+        metrics['valid_currencies_percent'] = self._valid_percent('invalid_currency', 'price_currency')
+        return metrics
+
+
 def calculate_quality_metrics(df_gr, df_gb):
     """
     Calcula métricas de calidad de datos para Goodreads y Google Books.
     """
-    metrics = {}
-    
-    for source, df in [('goodreads', df_gr), ('googlebooks', df_gb)]:
-        # Normalizar valores vacíos
-        df = df.replace({'': np.nan, 'nan': np.nan, None: np.nan})
-        
-        # Null percentage por columna
-        null_percent = {col: df[col].isnull().mean() * 100 for col in df.columns}
-        
-        # Filas válidas
-        valid_rows_percent = (df['validation_flag'] == 'valid').mean() * 100
-        
-        metrics[source] = {
-            'row_count': len(df),
-            'null_percent': null_percent,
-            'valid_rows_percent': valid_rows_percent
-        }
-    
-    # Métricas globales
-    metrics['total_rows'] = len(df_gr) + len(df_gb)
-    
-    metrics['valid_dates_percent'] = np.mean([
-        (df_gr['validation_flag'] != 'invalid_date').mean() * 100 if 'pub_date' in df_gr else 100,
-        (df_gb['validation_flag'] != 'invalid_date').mean() * 100 if 'pub_date' in df_gb else 100
-    ])
-    
-    metrics['valid_languages_percent'] = np.mean([
-        (df_gr['validation_flag'] != 'invalid_language').mean() * 100 if 'language' in df_gr else 100,
-        (df_gb['validation_flag'] != 'invalid_language').mean() * 100 if 'language' in df_gb else 100
-    ])
-    
-    metrics['valid_currencies_percent'] = np.mean([
-        (df_gr['validation_flag'] != 'invalid_currency').mean() * 100 if 'price_currency' in df_gr else 100,
-        (df_gb['validation_flag'] != 'invalid_currency').mean() * 100 if 'price_currency' in df_gb else 100
-    ])
-    
-    return metrics
+    return QualityMetrics().add(df_gr, df_gb).to_dict()